@@ -1,18 +1,58 @@
 import sqlite3
 import functools
-from datetime import datetime  
+import random
+import time
+from query_log import QueryLogger
+
+# Shared writer for every @log_queries function without its own logger
+default_logger = QueryLogger()
+
+# Decorator to log SQL queries as structured JSON lines
+def log_queries(func=None, *, logger=None, sample_rate=1.0, slow_threshold=None):
+    """Log each query's SQL, parameters, duration and row count.
+
+    Records are JSON lines written by a background thread, so the caller
+    only pays for timing the call and queueing a dict. `sample_rate` logs
+    that fraction of calls; queries slower than `slow_threshold` seconds
+    and failed queries are always logged and marked.
+    """
+    if func is None:
+        return functools.partial(log_queries, logger=logger,
+                                 sample_rate=sample_rate,
+                                 slow_threshold=slow_threshold)
 
-# Decorator to log SQL queries with timestamp
-def log_queries(func):
     @functools.wraps(func)
     def wrapper_log(*args, **kwargs):
         query = kwargs.get('query') or (args[0] if args else None)
-        if query:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            print(f"[{timestamp}] Executing SQL Query: {query}")
-        else:
-            print("[LOG] No SQL query provided")
-        return func(*args, **kwargs)
+        result = error = None
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+            return result
+        except Exception as err:
+            error = err
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            slow = slow_threshold is not None and duration >= slow_threshold
+            if slow or error is not None or sample_rate >= 1.0 \
+                    or random.random() < sample_rate:
+                params = kwargs.get('params', args[1] if len(args) > 1 else None)
+                entry = {
+                    "ts": time.time(),
+                    "function": func.__qualname__,
+                    "sql": query,
+                    "params": params,
+                    "duration_ms": round(duration * 1000, 3),
+                    "rows": len(result) if isinstance(result, list) else None,
+                }
+                if slow:
+                    entry["slow"] = True
+                if error is not None:
+                    entry["error"] = repr(error)
+                if sample_rate < 1.0:
+                    entry["sample_rate"] = sample_rate
+                (logger or default_logger).record(entry)
     return wrapper_log
 
 @log_queries
@@ -24,6 +64,7 @@ def fetch_all_users(query):
     conn.close()
     return results
 
-# Fetch users while logging the query
-users = fetch_all_users(query="SELECT * FROM users")
-print(users)
+if __name__ == "__main__":
+    # Fetch users while logging the query
+    users = fetch_all_users(query="SELECT * FROM users")
+    print(users)
@@ -1,12 +1,76 @@
+import asyncio
 import sqlite3
 import functools
+import inspect
+from db_pool import DEFAULT_DATABASE, get_default_pool
+
+async def _acquire_async(pool):
+    """Borrow from `pool` on a worker thread, so waiting never blocks the loop"""
+    borrowing = asyncio.ensure_future(asyncio.to_thread(pool.acquire))
+
+    def give_back(done):
+        if not done.cancelled() and done.exception() is None:
+            pool.release(done.result())
+
+    try:
+        return await asyncio.shield(borrowing)
+    except asyncio.CancelledError:
+        # The thread may still get a connection nobody will use
+        borrowing.add_done_callback(give_back)
+        raise
+
+def with_db_connection(func=None, *, database=DEFAULT_DATABASE, pool=None):
+    """Decorator to open and close a database connection around a function call.
+
+    Use bare (@with_db_connection) or with options:
+    @with_db_connection(database='other.db') connects to another file, and
+    @with_db_connection(pool=ConnectionPool(...)) borrows from a pool.
+    Bare decorators also borrow from the pool given to
+    db_pool.set_default_pool, when one is set. Coroutine functions keep
+    the connection until the coroutine finishes and wait for a pooled one
+    off the event loop. Every coroutine on a loop shares its thread, so
+    per-thread pools are bypassed for them: each opens its own connection.
+    """
+    if func is None:
+        return functools.partial(with_db_connection, database=database, pool=pool)
+
+    def active_pool():
+        if pool is not None:
+            return pool
+        default = get_default_pool()
+        if default is not None and default.database == database:
+            return default
+        return None
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper_with_connection_async(*args, **kwargs):
+            borrowed = active_pool()
+            if borrowed is not None and not borrowed.per_thread:
+                conn = await _acquire_async(borrowed)
+                try:
+                    return await func(conn, *args, **kwargs)
+                finally:
+                    borrowed.release(conn)
+            # The coroutine may hand the connection to a worker thread
+            conn = sqlite3.connect(
+                database if borrowed is None else borrowed.database,
+                check_same_thread=False)
+            try:
+                return await func(conn, *args, **kwargs)
+            finally:
+                conn.close()
+        return wrapper_with_connection_async
 
-def with_db_connection(func):
-    """Decorator to open and close a database connection around a function call."""
     @functools.wraps(func)
     def wrapper_with_connection(*args, **kwargs):
+        borrowed = active_pool()
+        if borrowed is not None:
+            # Borrow a pooled connection; it is reset and returned afterwards
+            with borrowed.connection() as conn:
+                return func(conn, *args, **kwargs)
         # Open the database connection
-        conn = sqlite3.connect('users.db')  # Replace with your actual DB name/path
+        conn = sqlite3.connect(database)
         try:
             # Pass the connection to the decorated function
             result = func(conn, *args, **kwargs)
@@ -22,6 +86,7 @@ def get_user_by_id(conn, user_id):
     cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
     return cursor.fetchone()
 
-# Fetch user by ID with automatic connection handling
-user = get_user_by_id(user_id=1)
-print(user)
+if __name__ == "__main__":
+    # Fetch user by ID with automatic connection handling
+    user = get_user_by_id(user_id=1)
+    print(user)
@@ -1,32 +1,50 @@
-import sqlite3
 import functools
+import result_cache
 
-# Decorator: handles opening and closing the DB connection
-def with_db_connection(func):
-    """Decorator to manage DB connection lifecycle."""
-    @functools.wraps(func)
-    def wrapper_with_connection(*args, **kwargs):
-        conn = sqlite3.connect('users.db')  # Replace with your DB path if needed
-        try:
-            result = func(conn, *args, **kwargs)
-        finally:
-            conn.close()
-        return result
-    return wrapper_with_connection
+# Decorator: handles opening and closing (or pooling) the DB connection
+with_db_connection = __import__('1-with_db_connection').with_db_connection
 
 # Decorator: handles transaction management (commit/rollback)
-def transactional(func):
-    """Decorator to manage DB transactions."""
+def transactional(func=None, *, group_commit=None):
+    """Decorator to manage DB transactions.
+
+    SQLite reports every table the call writes to through an authorizer;
+    after a successful commit, cached results read from those tables are
+    invalidated.
+
+    With group_commit=GroupCommitter(...), calls are not given a connection
+    by the caller (drop @with_db_connection): they run on the committer's
+    writer, batched with concurrent calls into one commit, and each caller
+    still gets its own result or exception.
+    """
+    if func is None:
+        return functools.partial(transactional, group_commit=group_commit)
+
+    if group_commit is not None:
+        @functools.wraps(func)
+        def wrapper_group_commit(*args, **kwargs):
+            try:
+                return group_commit.call(func, *args, **kwargs)
+            except Exception as e:
+                print(f"Transaction rolled back due to: {e}")
+                raise
+        return wrapper_group_commit
+
     @functools.wraps(func)
     def wrapper_transaction(conn, *args, **kwargs):
+        written = set()
+        conn.set_authorizer(result_cache.write_tracker(written))
         try:
             result = func(conn, *args, **kwargs)
             conn.commit()
-            return result
         except Exception as e:
             conn.rollback()
             print(f"Transaction rolled back due to: {e}")
             raise
+        finally:
+            conn.set_authorizer(None)
+        result_cache.invalidate_tables(written)
+        return result
     return wrapper_transaction
 
 @with_db_connection
@@ -36,4 +54,5 @@ def update_user_email(conn, user_id, new_email):
     cursor.execute("UPDATE users SET email = ? WHERE id = ?", (new_email, user_id))
 
 # Example usage
-update_user_email(user_id=1, new_email='Crawford_Cartwright@hotmail.com')
+if __name__ == "__main__":
+    update_user_email(user_id=1, new_email='Crawford_Cartwright@hotmail.com')
@@ -1,38 +1,86 @@
+import asyncio
 import time
+import random
 import sqlite3
 import functools
+import inspect
 
-# Decorator to manage DB connection
-def with_db_connection(func):
-    """Decorator to handle DB connection lifecycle."""
-    @functools.wraps(func)
-    def wrapper_with_connection(*args, **kwargs):
-        conn = sqlite3.connect('users.db')  # Update path if needed
-        try:
-            result = func(conn, *args, **kwargs)
-        finally:
-            conn.close()
-        return result
-    return wrapper_with_connection
+# Decorator to manage (or pool) the DB connection
+with_db_connection = __import__('1-with_db_connection').with_db_connection
+
+# SQLite result codes for contention; both clear once the other writer is done
+_TRANSIENT_CODES = {5, 6}  # SQLITE_BUSY, SQLITE_LOCKED
+_TRANSIENT_MESSAGES = ("database is locked", "database is busy",
+                       "database table is locked")
+
+def is_transient(error):
+    """Whether an error is lock contention worth retrying"""
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    # sqlite_errorcode exists from Python 3.11; older versions only have text
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None and code & 0xff in _TRANSIENT_CODES:
+        return True
+    message = str(error).lower()
+    return any(text in message for text in _TRANSIENT_MESSAGES)
+
+def backoff_delay(attempt, delay, max_delay):
+    """Full-jitter backoff: uniform in [0, min(max_delay, delay * 2**attempt)]"""
+    return random.uniform(0, min(max_delay, delay * 2 ** attempt))
 
 # Decorator to retry failed DB operations
-def retry_on_failure(retries=3, delay=2):
-    """Retry decorator with customizable retries and delay."""
+def retry_on_failure(retries=3, delay=2, max_delay=30, deadline=None,
+                     retry_if=is_transient):
+    """Retry decorator with capped, jittered exponential backoff.
+
+    Only errors for which `retry_if` returns True are retried (by default
+    SQLite lock contention); anything else is raised at once. The wait
+    before retry n is random between 0 and min(max_delay, delay * 2**n),
+    so contending callers spread out instead of waking together. With
+    `deadline`, no retry starts once that many seconds have passed since
+    the first attempt. Coroutine functions wait with asyncio.sleep.
+    """
+    def should_retry(error, attempts, started):
+        if attempts >= retries or not retry_if(error):
+            return None
+        wait = backoff_delay(attempts - 1, delay, max_delay)
+        if deadline is not None and \
+                time.monotonic() - started + wait > deadline:
+            return None
+        return wait
+
     def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper_retry_async(*args, **kwargs):
+                attempts = 0
+                started = time.monotonic()
+                while True:
+                    try:
+                        return await func(*args, **kwargs)
+                    except Exception as e:
+                        attempts += 1
+                        wait = should_retry(e, attempts, started)
+                        if wait is None:
+                            raise
+                        print(f"Attempt {attempts} failed: {e}")
+                        await asyncio.sleep(wait)
+            return wrapper_retry_async
+
         @functools.wraps(func)
         def wrapper_retry(*args, **kwargs):
             attempts = 0
-            while attempts < retries:
+            started = time.monotonic()
+            while True:
                 try:
                     return func(*args, **kwargs)
                 except Exception as e:
                     attempts += 1
-                    print(f"Attempt {attempts} failed: {e}")
-                    if attempts < retries:
-                        time.sleep(delay)
-                    else:
-                        print("All retry attempts failed.")
+                    wait = should_retry(e, attempts, started)
+                    if wait is None:
                         raise
+                    print(f"Attempt {attempts} failed: {e}")
+                    time.sleep(wait)
         return wrapper_retry
     return decorator
 
@@ -44,5 +92,6 @@ def fetch_users_with_retry(conn):
     return cursor.fetchall()
 
 # Run and print results
-users = fetch_users_with_retry()
-print(users)
+if __name__ == "__main__":
+    users = fetch_users_with_retry()
+    print(users)
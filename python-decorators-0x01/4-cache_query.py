@@ -1,47 +1,173 @@
-import sqlite3
+import asyncio
 import functools
+import inspect
+from result_cache import QueryCache, Refresher, make_key, tables_in
+from singleflight import AsyncSingleFlight, SingleFlight
 
-# In-memory query result cache
-query_cache = {}
+# In-memory query result cache: LRU-bounded, TTL-aware and invalidated by
+# writes made through @transactional
+query_cache = QueryCache()
 
-# Decorator to manage database connection
-def with_db_connection(func):
-    """Decorator to handle DB connection lifecycle."""
-    @functools.wraps(func)
-    def wrapper_with_connection(*args, **kwargs):
-        conn = sqlite3.connect('users.db')  # Adjust path if needed
-        try:
-            return func(conn, *args, **kwargs)
-        finally:
-            conn.close()
-    return wrapper_with_connection
+# Background worker for refresh-ahead entries
+refresher = Refresher()
+
+# Decorator to manage (or pool) the database connection
+with_db_connection = __import__('1-with_db_connection').with_db_connection
 
 # Decorator to cache query results
-def cache_query(func):
-    """Cache query results to avoid redundant database calls."""
+def cache_query(func=None, *, cache=None, ttl=None, refresh_ahead=None,
+                database=None, pool=None):
+    """Cache query results to avoid redundant database calls.
+
+    Results are keyed by the function, the query and its bound parameters
+    and tagged with the tables the query reads; a result read while a
+    write to one of those tables committed is returned but not cached. Use bare or as @cache_query(ttl=60) to
+    expire entries, or pass cache=QueryCache(...) for separate limits;
+    cache=TieredCache(SharedStore('query_cache.db')) from shared_cache
+    shares results between worker processes on the host.
+    Concurrent misses for the same key run the query once and share the
+    result; coroutine functions get the same behaviour on the event loop.
+
+    With refresh_ahead=0.2, a hit in the last 20% of an entry's TTL still
+    returns the cached value but reloads it in the background, over a
+    connection to `database` (or from `pool`), so callers rarely see a miss.
+    One of them is required, since the caller's connection is gone by then.
+    """
+    if func is None:
+        return functools.partial(cache_query, cache=cache, ttl=ttl,
+                                 refresh_ahead=refresh_ahead,
+                                 database=database, pool=pool)
+
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    def lookup(query, args, kwargs):
+        store = query_cache if cache is None else cache
+        key = make_key(query, args, kwargs, name)
+        return store, key
+
+    def due_for_refresh(store, key):
+        if refresh_ahead is None:
+            return False
+        lifetime = store.ttl if ttl is None else ttl
+        remaining = store.expires_in(key)
+        return lifetime is not None and remaining is not None \
+            and remaining <= lifetime * refresh_ahead
+
+    if refresh_ahead is not None:
+        if database is None and pool is None:
+            raise ValueError("refresh_ahead needs database= or pool= "
+                             "to reconnect for background refreshes")
+        reload_query = with_db_connection(
+            func, database=database if pool is None else pool.database,
+            pool=pool)
+
+    if inspect.iscoroutinefunction(func):
+        flights = AsyncSingleFlight()
+        refreshing = set()
+
+        async def refresh_async(store, key, query, args, kwargs):
+            async def load():
+                tables = tables_in(query)
+                generations = store.generations(tables)
+                result = await reload_query(query, *args, **kwargs)
+                store.set(key, result, tables=tables, ttl=ttl,
+                          generations=generations)
+                return result
+            try:
+                await flights.do(key, load)
+            except Exception:
+                store.record_refresh(failed=True)
+            else:
+                store.record_refresh()
+
+        @functools.wraps(func)
+        async def wrapper_cache_async(conn, query, *args, **kwargs):
+            store, key = lookup(query, args, kwargs)
+            found, result = store.get(key)
+            if found:
+                if due_for_refresh(store, key) and not flights.in_flight(key):
+                    task = asyncio.ensure_future(
+                        refresh_async(store, key, query, args, kwargs))
+                    # Hold a reference until it finishes
+                    refreshing.add(task)
+                    task.add_done_callback(refreshing.discard)
+                return result
+
+            async def load():
+                # A flight that just landed may have filled the cache
+                found, result = store.get(key, record=False)
+                if not found:
+                    tables = tables_in(query)
+                    generations = store.generations(tables)
+                    # Runs on this caller's connection; if it is cancelled,
+                    # flights.do holds it here until the query is done
+                    result = await func(conn, query, *args, **kwargs)
+                    store.set(key, result, tables=tables, ttl=ttl,
+                              generations=generations)
+                return result
+            return await flights.do(key, load)
+        wrapper_cache_async.flights = flights
+        return wrapper_cache_async
+
+    flights = SingleFlight()
+
+    def refresh(store, key, query, args, kwargs):
+        def load():
+            tables = tables_in(query)
+            generations = store.generations(tables)
+            result = reload_query(query, *args, **kwargs)
+            store.set(key, result, tables=tables, ttl=ttl,
+                      generations=generations)
+            return result
+        try:
+            # Misses arriving meanwhile join this flight instead of querying
+            flights.do(key, load)
+        except Exception:
+            store.record_refresh(failed=True)
+        else:
+            store.record_refresh()
+
     @functools.wraps(func)
     def wrapper_cache(conn, query, *args, **kwargs):
-        if query in query_cache:
-            print("[Cache] Returning cached result")
-            return query_cache[query]
-        print("[DB] Executing and caching new query")
-        result = func(conn, query, *args, **kwargs)
-        query_cache[query] = result
-        return result
+        store, key = lookup(query, args, kwargs)
+        found, result = store.get(key)
+        if found:
+            if due_for_refresh(store, key):
+                refresher.submit(
+                    (id(store), key),
+                    functools.partial(refresh, store, key, query, args, kwargs))
+            return result
+
+        def load():
+            # A flight that just landed may have filled the cache
+            found, result = store.get(key, record=False)
+            if not found:
+                tables = tables_in(query)
+                # Taken first, so a write committing during the query
+                # keeps its result out of the cache
+                generations = store.generations(tables)
+                result = func(conn, query, *args, **kwargs)
+                store.set(key, result, tables=tables, ttl=ttl,
+                          generations=generations)
+            return result
+        return flights.do(key, load)
+    wrapper_cache.flights = flights
     return wrapper_cache
 
 @with_db_connection
 @cache_query
-def fetch_users_with_cache(conn, query):
+def fetch_users_with_cache(conn, query, params=()):
     cursor = conn.cursor()
-    cursor.execute(query)
+    cursor.execute(query, params)
     return cursor.fetchall()
 
-# First call: hits the database and caches result
-users = fetch_users_with_cache(query="SELECT * FROM users")
+if __name__ == "__main__":
+    # First call: hits the database and caches result
+    users = fetch_users_with_cache(query="SELECT * FROM users")
 
-# Second call: uses cached result
-users_again = fetch_users_with_cache(query="SELECT * FROM users")
+    # Second call: uses cached result
+    users_again = fetch_users_with_cache(query="SELECT * FROM users")
 
-# Optional: print to verify both results are identical
-print(users == users_again)  # Should print: True
+    # Optional: print to verify both results are identical
+    print(users == users_again)  # Should print: True
+    print(query_cache.stats())
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""Benchmarks for the database decorators.
+
+Each benchmark builds a throwaway SQLite users table in a temp directory:
+
+    python3 benchmarks.py pool
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from db_pool import ConnectionPool
+
+with_db_connection = __import__('1-with_db_connection').with_db_connection
+
+
+def make_users_db(directory, rows=1000):
+    """Create a users table like create_table.py does, with synthetic rows"""
+    path = os.path.join(directory, "users.db")
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name VARCHAR(255) NOT NULL,
+            email VARCHAR(255) NOT NULL UNIQUE,
+            age INTEGER NOT NULL
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO users (name, email, age) VALUES (?, ?, ?)",
+        [(f"User {i}", f"user{i}@example.com", 18 + i % 80)
+         for i in range(rows)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def calls_per_second(func, calls, threads=1):
+    """Run func(i) `calls` times spread over `threads` threads"""
+    per_thread = calls // threads
+
+    def work(offset):
+        for i in range(per_thread):
+            func(offset + i)
+
+    workers = [threading.Thread(target=work, args=(n * per_thread,))
+               for n in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return per_thread * threads / (time.perf_counter() - start)
+
+
+def bench_pool(calls=20_000):
+    """get_user_by_id calls per second: fresh connections vs pooled"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = make_users_db(directory)
+        shared = ConnectionPool(path, max_size=4)
+        per_thread = ConnectionPool(path, per_thread=True)
+        variants = {
+            "unpooled": with_db_connection(database=path),
+            "shared pool": with_db_connection(database=path, pool=shared),
+            "per-thread pool": with_db_connection(database=path,
+                                                  pool=per_thread),
+        }
+        for threads in (1, 4):
+            for name, decorator in variants.items():
+                @decorator
+                def get_user_by_id(conn, user_id):
+                    cursor = conn.cursor()
+                    cursor.execute("SELECT * FROM users WHERE id = ?",
+                                   (user_id % 1000 + 1,))
+                    return cursor.fetchone()
+
+                rate = calls_per_second(get_user_by_id, calls, threads)
+                print(f"{threads} thread(s)  {name:<16} {rate:10,.0f} calls/s")
+        shared.close()
+        per_thread.close()
+
+
+def bench_log_queries(calls=50_000):
+    """Per-call overhead of log_queries over the undecorated query"""
+    log_queries = __import__('0-log_queries').log_queries
+    from query_log import QueryLogger
+
+    conn = sqlite3.connect(":memory:")
+
+    def fetch(query):
+        return conn.execute(query).fetchall()
+
+    with open(os.devnull, "w") as devnull:
+        logger = QueryLogger(devnull, max_queue=calls)
+        variants = {
+            "undecorated": fetch,
+            "every call": log_queries(fetch, logger=logger),
+            "1% sampled": log_queries(fetch, logger=logger, sample_rate=0.01),
+        }
+        baseline = None
+        for name, variant in variants.items():
+            start = time.perf_counter()
+            for _ in range(calls):
+                variant("SELECT 1")
+            logger.flush()
+            per_call = (time.perf_counter() - start) / calls * 1e6
+            baseline = per_call if baseline is None else baseline
+            print(f"{name:<12} {per_call:7.2f} us/call  "
+                  f"(+{per_call - baseline:.2f} us)")
+        logger.close()
+        print(f"records written: {logger.written}, dropped: {logger.dropped}")
+    conn.close()
+
+
+def bench_group_commit(calls=2000, threads=16):
+    """Concurrent update_user_email writes per second, per-call vs grouped"""
+    transactional = __import__('2-transactional').transactional
+    from group_commit import GroupCommitter
+
+    def update_user_email(conn, user_id, new_email):
+        conn.execute("UPDATE users SET email = ? WHERE id = ?",
+                     (new_email, user_id))
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = make_users_db(directory)
+        committer = GroupCommitter(path)
+        variants = {
+            "per-call commit": with_db_connection(database=path)(
+                transactional(update_user_email)),
+            "group commit": transactional(update_user_email,
+                                          group_commit=committer),
+        }
+        for name, update in variants.items():
+            def write(i):
+                update(i % 1000 + 1, f"user{i % 1000}@example.com")
+            rate = calls_per_second(write, calls, threads)
+            print(f"{threads} threads  {name:<16} {rate:10,.0f} writes/s")
+        committer.close()
+        print(f"group commit: {committer.calls} calls "
+              f"in {committer.batches} commits")
+
+
+BENCHMARKS = {
+    "pool": bench_pool,
+    "log_queries": bench_log_queries,
+    "group_commit": bench_group_commit,
+}
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        print(f"== {name}")
+        BENCHMARKS[name]()
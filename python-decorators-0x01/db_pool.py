@@ -0,0 +1,144 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DEFAULT_DATABASE = 'users.db'
+
+_default_pool = None
+
+class ConnectionPool:
+    """Reusable SQLite connections for the with_db_connection decorator.
+
+    In shared mode at most `max_size` connections exist; callers wait up to
+    `timeout` seconds for a free one. With per_thread=True every thread
+    keeps one connection of its own instead. Connections are health
+    checked with `SELECT 1` when borrowed and reset when returned: an open
+    transaction is rolled back and row_factory is cleared. In per-thread
+    mode a nested borrow on the same thread shares the outer borrow's
+    connection, so the reset waits until the outermost borrow is returned.
+    """
+
+    def __init__(self, database=DEFAULT_DATABASE, max_size=5, per_thread=False,
+                 timeout=5.0, health_check=True):
+        self.database = database
+        self.max_size = max_size
+        self.per_thread = per_thread
+        self.timeout = timeout
+        self.health_check = health_check
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._local = threading.local()
+        self._all = set()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.database, check_same_thread=False)
+        with self._lock:
+            self._all.add(conn)
+        return conn
+
+    def _discard(self, conn):
+        with self._lock:
+            self._all.discard(conn)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def _healthy(self, conn):
+        if not self.health_check:
+            return True
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _reset(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        conn.row_factory = None
+
+    def acquire(self):
+        """Borrow a live connection"""
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        if self.per_thread:
+            conn = getattr(self._local, "conn", None)
+            depth = getattr(self._local, "depth", 0)
+            # A nested borrow must not swap the connection out from under
+            # the outer one, which may be mid-transaction
+            if depth == 0 and (conn is None or not self._healthy(conn)):
+                if conn is not None:
+                    self._discard(conn)
+                conn = self._local.conn = self._connect()
+            self._local.depth = depth + 1
+            return conn
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(
+                f"No pooled connection to {self.database} freed up "
+                f"within {self.timeout}s (max_size={self.max_size})")
+        try:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                if self._healthy(conn):
+                    return conn
+                self._discard(conn)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn):
+        """Return a borrowed connection, resetting its session state"""
+        if self.per_thread:
+            self._local.depth -= 1
+            if self._local.depth:
+                return
+        try:
+            self._reset(conn)
+        except sqlite3.Error:
+            self._discard(conn)
+            if self.per_thread:
+                self._local.conn = None
+        else:
+            if self._closed:
+                self._discard(conn)
+            elif not self.per_thread:
+                self._idle.put(conn)
+        finally:
+            if not self.per_thread:
+                self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a with block"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Close every connection the pool has opened"""
+        self._closed = True
+        with self._lock:
+            conns, self._all = list(self._all), set()
+        for conn in conns:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+def set_default_pool(pool):
+    """Route every plain @with_db_connection call through `pool` (or None)"""
+    global _default_pool
+    _default_pool = pool
+
+def get_default_pool():
+    """The pool set by set_default_pool, if any"""
+    return _default_pool
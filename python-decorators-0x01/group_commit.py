@@ -0,0 +1,175 @@
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from db_pool import DEFAULT_DATABASE
+import result_cache
+
+_STOP = object()
+
+class GroupCommitter:
+    """Single writer that commits many transactional calls at once.
+
+    Callers submit functions taking a connection; the writer thread runs
+    every call queued within `window` seconds of the first (up to
+    `max_batch`) in one transaction, so a burst of writes costs one commit
+    and one fsync instead of one each. Each call runs inside its own
+    savepoint: a call that raises is rolled back alone and its caller gets
+    the exception, while the rest of the batch still commits. If the
+    commit itself fails, every call in the batch gets that error.
+    Functions must not commit or roll back the connection themselves.
+
+    call() waits at most `timeout` seconds (None waits forever) for its
+    batch to start; a call still queued then is withdrawn and raises
+    TimeoutError, so it never runs. Once its batch has started, call()
+    waits for the outcome, since the write may already be committed and
+    a retry would apply it twice. If the writer thread dies, calls still
+    queued fail with RuntimeError and the next submit() starts a fresh
+    writer.
+    """
+
+    def __init__(self, database=DEFAULT_DATABASE, window=0.002, max_batch=256,
+                 timeout=30.0):
+        self.database = database
+        self.window = window
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.batches = 0
+        self.calls = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, **kwargs):
+        """Queue func(conn, *args, **kwargs); returns a Future for its result"""
+        future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True,
+                                                name="group-commit")
+                self._thread.start()
+            self._queue.put((future, func, args, kwargs))
+        return future
+
+    def call(self, func, *args, **kwargs):
+        """Run func in the next group commit and return its result"""
+        future = self.submit(func, *args, **kwargs)
+        try:
+            return future.result(self.timeout)
+        except FutureTimeoutError:
+            # Still queued: withdraw it so it never runs after we gave up
+            if future.cancel():
+                raise
+        # Already running, and maybe committing: report what happened
+        return future.result()
+
+    def _run(self):
+        try:
+            self._write()
+        except BaseException as err:
+            self._writer_died(err)
+
+    def _writer_died(self, err):
+        with self._lock:
+            if self._thread is threading.current_thread():
+                self._thread = None
+            # submit() queues under the same lock, so nothing queued for a
+            # replacement writer can be taken here
+            while True:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is _STOP:
+                    continue
+                future = job[0]
+                if future.set_running_or_notify_cancel():
+                    error = RuntimeError("Group-commit writer stopped")
+                    error.__cause__ = err
+                    future.set_exception(error)
+
+    def _write(self):
+        # Autocommit mode, so BEGIN/SAVEPOINT/COMMIT are issued explicitly
+        conn = sqlite3.connect(self.database, isolation_level=None)
+        try:
+            while True:
+                job = self._queue.get()
+                if job is _STOP:
+                    return
+                batch = [job]
+                deadline = time.monotonic() + self.window
+                stop = False
+                while len(batch) < self.max_batch:
+                    try:
+                        job = self._queue.get(
+                            timeout=max(0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if job is _STOP:
+                        stop = True
+                        break
+                    batch.append(job)
+                self._commit(conn, batch)
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    def _commit(self, conn, batch):
+        written = set()
+        call_writes = set()
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for future, func, args, kwargs in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                call_writes.clear()
+                # The authorizer only sees statements as they are prepared;
+                # installing it again expires the cached ones, so a call
+                # repeating an earlier call's SQL is still tracked
+                conn.set_authorizer(result_cache.write_tracker(call_writes))
+                conn.execute("SAVEPOINT group_commit_call")
+                try:
+                    result = func(conn, *args, **kwargs)
+                except Exception as err:
+                    conn.execute("ROLLBACK TO group_commit_call")
+                    conn.execute("RELEASE group_commit_call")
+                    outcomes.append((future, None, err))
+                else:
+                    conn.execute("RELEASE group_commit_call")
+                    written |= call_writes
+                    outcomes.append((future, result, None))
+            conn.execute("COMMIT")
+        except BaseException as err:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for future, _, error in outcomes:
+                if error is not None:
+                    future.set_exception(error)
+            for future, _, _, _ in batch:
+                if not future.done():
+                    future.set_exception(err)
+            if not isinstance(err, Exception):
+                raise
+            return
+        finally:
+            conn.set_authorizer(None)
+        self.batches += 1
+        self.calls += len(outcomes)
+        result_cache.invalidate_tables(written)
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def close(self):
+        """Commit what is queued, then stop the writer"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._queue.put(_STOP)
+        if thread is not None:
+            thread.join()
@@ -0,0 +1,114 @@
+import atexit
+import json
+import queue
+import sys
+import threading
+
+_STOP = object()
+
+class QueryLogger:
+    """Writes query records as JSON lines from a background thread.
+
+    record() only puts a dict on a bounded queue, so the calling thread
+    never formats or writes anything; when the queue is full the record is
+    dropped and counted in `dropped` rather than blocking the caller.
+    `stream` is any text file object, or a path to append to. The writer
+    starts on the first record and is flushed and stopped at exit. Records
+    that fail to encode or write are counted in `errors`; once closed, the
+    logger ignores further records.
+    """
+
+    def __init__(self, stream=None, max_queue=10_000, batch_size=256):
+        self.stream = stream
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.dropped = 0
+        self.written = 0
+        self.errors = 0
+        self._closed = False
+        # SimpleQueue is lock-free on put; qsize() bounds it approximately
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._owns_stream = False
+
+    def _start(self):
+        with self._lock:
+            if self._thread is not None or self._closed:
+                return
+            if self.stream is None:
+                self.stream = sys.stdout
+            elif isinstance(self.stream, str):
+                self.stream = open(self.stream, "a", encoding="utf-8")
+                self._owns_stream = True
+            self._thread = threading.Thread(target=self._run, daemon=True,
+                                            name="query-log")
+            self._thread.start()
+            atexit.register(self.close)
+
+    def record(self, entry):
+        """Queue one record without blocking; False if it was dropped"""
+        if self._closed:
+            return False
+        if self._thread is None:
+            self._start()
+        if self._queue.qsize() >= self.max_queue:
+            self.dropped += 1
+            return False
+        self._queue.put(entry)
+        return True
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines = []
+            stop = False
+            flushed = []
+            for entry in batch:
+                if entry is _STOP:
+                    stop = True
+                elif isinstance(entry, threading.Event):
+                    flushed.append(entry)
+                else:
+                    try:
+                        lines.append(json.dumps(entry, default=repr) + "\n")
+                    except (TypeError, ValueError):
+                        self.errors += 1
+            if lines:
+                # A failing stream must not kill the writer, or flush() and
+                # close() would wait on it forever
+                try:
+                    self.stream.write("".join(lines))
+                    self.stream.flush()
+                    self.written += len(lines)
+                except (OSError, ValueError):
+                    self.errors += len(lines)
+            for event in flushed:
+                event.set()
+            if stop:
+                return
+
+    def flush(self):
+        """Block until every queued record has been written"""
+        if self._thread is not None:
+            done = threading.Event()
+            self._queue.put(done)
+            done.wait()
+
+    def close(self):
+        """Write what is queued, then stop the writer"""
+        with self._lock:
+            self._closed = True
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join()
+        atexit.unregister(self.close)
+        if self._owns_stream:
+            self.stream.close()
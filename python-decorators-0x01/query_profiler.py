@@ -0,0 +1,167 @@
+import bisect
+import functools
+import re
+import sqlite3
+import threading
+import time
+
+# Histogram bucket upper bounds, in seconds: 50us .. 10s, then overflow
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+           0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_STRING_RE = re.compile(r"[xX]?'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+# "SCAN users" or "SCAN TABLE users", but not "SCAN users USING INDEX ..."
+_FULL_SCAN_RE = re.compile(r"^SCAN (?:TABLE )?(?!CONSTANT ROW)(\w+)(?!.*\bUSING\b)")
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "REPLACE")
+
+def normalize_sql(sql):
+    """Collapse literals, IN lists and whitespace so similar queries group.
+
+    "SELECT * FROM users WHERE id IN (1, 2)" and the same query with other
+    ids both become "SELECT * FROM users WHERE id IN (?)".
+    """
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("(?)", sql)
+    return _SPACE_RE.sub(" ", sql).strip().rstrip(";")
+
+class LatencyHistogram:
+    """Fixed log-spaced latency buckets with count, total and max"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        """Record one latency"""
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile (0-100)"""
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS + (self.max,), self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+class QueryProfile:
+    """Latency histogram and captured plan for one normalized statement"""
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.histogram = LatencyHistogram()
+        self.plan = None
+        self.full_scans = ()
+
+    @property
+    def full_scan(self):
+        return bool(self.full_scans)
+
+class QueryProfiler:
+    """Registry of per-statement latency, keyed by normalized SQL.
+
+    The first time a statement takes `slow_threshold` seconds or more, its
+    EXPLAIN QUERY PLAN is captured on the same connection and any tables
+    it scans without an index are recorded in `full_scans`.
+    """
+
+    def __init__(self, slow_threshold=0.05):
+        self.slow_threshold = slow_threshold
+        self.profiles = {}
+        self._lock = threading.Lock()
+
+    def record(self, conn, sql, seconds):
+        """Add one execution of `sql`, explaining it if slow and unexplained"""
+        key = normalize_sql(sql)
+        with self._lock:
+            profile = self.profiles.get(key)
+            if profile is None:
+                profile = self.profiles[key] = QueryProfile(key)
+            profile.histogram.add(seconds)
+            explain = profile.plan is None and seconds >= self.slow_threshold \
+                and key.upper().startswith(_EXPLAINABLE)
+            if explain:
+                profile.plan = []  # claim it so only one caller explains
+        if explain:
+            profile.plan = self.explain(conn, sql)
+            profile.full_scans = tuple(
+                match.group(1) for match in map(_FULL_SCAN_RE.match, profile.plan)
+                if match)
+
+    def explain(self, conn, sql):
+        """EXPLAIN QUERY PLAN detail lines for a statement"""
+        try:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+        except sqlite3.Error as err:
+            return [f"EXPLAIN failed: {err}"]
+        return [row[-1] for row in rows]
+
+    def top(self, n=10):
+        """The n profiles with the most total time"""
+        with self._lock:
+            profiles = list(self.profiles.values())
+        profiles.sort(key=lambda profile: profile.histogram.total, reverse=True)
+        return profiles[:n]
+
+    def report(self, n=10):
+        """Text table of the top n statements by total time"""
+        lines = [f"{'calls':>7} {'total ms':>10} {'mean ms':>9} {'p95 ms':>9} "
+                 f"{'max ms':>9}  scan  sql"]
+        for profile in self.top(n):
+            hist = profile.histogram
+            flag = "FULL" if profile.full_scan else ""
+            lines.append(
+                f"{hist.count:>7} {hist.total * 1000:>10.2f} "
+                f"{hist.total / hist.count * 1000:>9.3f} "
+                f"{hist.percentile(95) * 1000:>9.3f} {hist.max * 1000:>9.3f}  "
+                f"{flag:<4}  {profile.sql}")
+            for detail in profile.plan or ():
+                lines.append(f"{'':>8}-> {detail}")
+        return "\n".join(lines)
+
+    def reset(self):
+        """Forget every profile"""
+        with self._lock:
+            self.profiles.clear()
+
+# Registry used by @profile_queries unless given another
+default_profiler = QueryProfiler()
+
+def profile_queries(func=None, *, profiler=None):
+    """Profile every statement a function runs on its connection.
+
+    The function takes the connection first, as under @with_db_connection.
+    A trace callback notes each statement as SQLite starts it; a statement's
+    time runs until the next one starts or the function returns, so it
+    includes fetching its rows. The trace callback is removed afterwards.
+    """
+    if func is None:
+        return functools.partial(profile_queries, profiler=profiler)
+
+    @functools.wraps(func)
+    def wrapper_profile(conn, *args, **kwargs):
+        registry = profiler or default_profiler
+        started = []
+        conn.set_trace_callback(
+            lambda sql: started.append((time.perf_counter(), sql)))
+        try:
+            return func(conn, *args, **kwargs)
+        finally:
+            end = time.perf_counter()
+            conn.set_trace_callback(None)
+            for i, (start, sql) in enumerate(started):
+                until = started[i + 1][0] if i + 1 < len(started) else end
+                registry.record(conn, sql, until - start)
+    return wrapper_profile
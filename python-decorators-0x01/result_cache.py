@@ -0,0 +1,312 @@
+import queue
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+# String literals, quoted identifiers, words and single punctuation marks
+_TOKEN_RE = re.compile(
+    r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`[^`]*`|\[[^\]]*\]|\w+|\S")
+# Keywords ending a FROM list
+_FROM_END = {"WHERE", "GROUP", "ORDER", "LIMIT", "HAVING", "UNION",
+             "INTERSECT", "EXCEPT", "WINDOW", "RETURNING", ";"}
+
+# Every live cache, so writes can invalidate all of them at once
+_caches = weakref.WeakSet()
+
+def _table_name(tokens, i):
+    """Unquoted, lower-cased table name at tokens[i], dropping a schema"""
+    if i + 2 < len(tokens) and tokens[i + 1] == ".":
+        i += 2
+    token = tokens[i]
+    if token[0] in "\"`[":
+        token = token[1:-1]
+    return token.lower()
+
+def tables_in(sql):
+    """Lower-cased names of the tables a statement reads or writes.
+
+    Covers JOIN, INSERT INTO and UPDATE targets and every item of a FROM
+    list, including comma joins; subqueries are handled by their own FROM.
+    """
+    tokens = _TOKEN_RE.findall(sql)
+    tables = set()
+    for i, token in enumerate(tokens):
+        word = token.upper()
+        if word in ("JOIN", "INTO", "UPDATE"):
+            if i + 1 < len(tokens) and tokens[i + 1] != "(":
+                tables.add(_table_name(tokens, i + 1))
+        elif word == "FROM":
+            depth = 0
+            expect_table = True
+            for j in range(i + 1, len(tokens)):
+                item = tokens[j]
+                if item == "(":
+                    depth += 1
+                    expect_table = False
+                elif item == ")":
+                    if depth == 0:
+                        break
+                    depth -= 1
+                elif depth:
+                    continue
+                elif item == ",":
+                    expect_table = True
+                elif item.upper() in _FROM_END:
+                    break
+                elif expect_table:
+                    tables.add(_table_name(tokens, j))
+                    expect_table = False
+    return frozenset(tables)
+
+def _freeze(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+def make_key(query, args=(), kwargs=None, name=None):
+    """Cache key for a query, its bound parameters and the caller's name"""
+    return (name, query, _freeze(args), _freeze(kwargs or {}))
+
+def approximate_size(value):
+    """Rough payload bytes of a query result.
+
+    Strings and bytes count their length, containers add 8 bytes per item
+    plus their contents, anything else counts 8 bytes.
+    """
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return sum(8 + approximate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sum(16 + approximate_size(v) for v in value.values())
+    return 8
+
+_WRITE_ACTIONS = (sqlite3.SQLITE_INSERT, sqlite3.SQLITE_UPDATE,
+                  sqlite3.SQLITE_DELETE)
+
+def write_tracker(written):
+    """SQLite authorizer adding each table a statement writes to `written`"""
+    def track_writes(action, table, *_):
+        if action in _WRITE_ACTIONS and table:
+            written.add(table)
+        return sqlite3.SQLITE_OK
+    return track_writes
+
+def invalidate_tables(tables):
+    """Drop entries depending on any of `tables` from every cache"""
+    tables = frozenset(name.lower() for name in tables)
+    if not tables:
+        return 0
+    return sum(cache.invalidate_tables(tables) for cache in list(_caches))
+
+class _Entry:
+    __slots__ = ("value", "size", "tables", "expires")
+
+    def __init__(self, value, size, tables, expires):
+        self.value = value
+        self.size = size
+        self.tables = tables
+        self.expires = expires
+
+class QueryCache:
+    """Bounded, thread-safe LRU cache of query results.
+
+    Entries are evicted least recently used first once there are more than
+    `max_entries` of them or their approximate size passes `max_bytes`.
+    Each entry may carry a TTL in seconds (falling back to the cache's
+    `ttl`) and the set of tables it was read from, so writes to those
+    tables can drop it through invalidate_tables().
+
+    A result read while one of its tables was being written may already
+    be stale: take generations(tables) before running the query and pass
+    it to set(), which then skips the result if any table was invalidated
+    meanwhile.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=32 << 20, ttl=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        # Invalidation count per table, to spot writes racing a load
+        self._generations = {}
+        _caches.add(self)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self.get(key, record=False)[0]
+
+    def get(self, key, record=True):
+        """Return (found, value), refreshing the entry's LRU position"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires is not None \
+                    and entry.expires <= time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                if record:
+                    self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            if record:
+                self.hits += 1
+            return True, entry.value
+
+    def expires_in(self, key):
+        """Seconds until the entry expires; None if it never does or is gone"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires is None:
+                return None
+            return entry.expires - time.monotonic()
+
+    def record_refresh(self, failed=False):
+        """Count one background refresh"""
+        with self._lock:
+            if failed:
+                self.refresh_errors += 1
+            else:
+                self.refreshes += 1
+
+    def generations(self, tables):
+        """Snapshot of how often each of `tables` was invalidated, for set()"""
+        with self._lock:
+            return {name: self._generations.get(name, 0) for name in tables}
+
+    def is_current(self, generations):
+        """Whether no table in a generations() snapshot was invalidated since"""
+        with self._lock:
+            return all(self._generations.get(name, 0) == generation
+                       for name, generation in generations.items())
+
+    def set(self, key, value, tables=(), ttl=None, generations=None):
+        """Store a result; a TTL of None uses the cache default.
+
+        With a generations() snapshot, a result whose tables were
+        invalidated since is not stored; returns whether it was.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires = None if ttl is None else time.monotonic() + ttl
+        size = approximate_size(value)
+        with self._lock:
+            if generations is not None and not self.is_current(generations):
+                return False
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                # Caching it would only flush everything else
+                return False
+            self._entries[key] = _Entry(value, size, frozenset(tables), expires)
+            self.nbytes += size
+            while len(self._entries) > self.max_entries \
+                    or self.nbytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            return True
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self.nbytes -= entry.size
+
+    def invalidate(self, key):
+        """Drop a single entry, if present"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                self.invalidations += 1
+
+    def invalidate_tables(self, tables):
+        """Drop every entry that read from one of `tables`"""
+        with self._lock:
+            for name in tables:
+                self._generations[name] = self._generations.get(name, 0) + 1
+            stale = [key for key, entry in self._entries.items()
+                     if entry.tables & tables]
+            for key in stale:
+                self._remove(key)
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        """Counters and current size, as a dict"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.nbytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "refreshes": self.refreshes,
+                "refresh_errors": self.refresh_errors,
+            }
+
+class Refresher:
+    """Background threads that recompute cache entries ahead of expiry.
+
+    submit() queues a refresh unless one for the same key is already
+    pending; when more than `max_pending` are waiting, new ones are dropped
+    and the entry simply expires as usual. Threads start on first use.
+    """
+
+    def __init__(self, workers=1, max_pending=256):
+        self.workers = workers
+        self._queue = queue.Queue(max_pending)
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def submit(self, key, func):
+        """Queue func() to run in the background; False if not queued"""
+        with self._lock:
+            if key in self._pending:
+                return False
+            try:
+                self._queue.put_nowait((key, func))
+            except queue.Full:
+                return False
+            self._pending.add(key)
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, daemon=True,
+                                          name="cache-refresh")
+                thread.start()
+                self._threads.append(thread)
+            return True
+
+    def pending(self):
+        """Number of refreshes queued or running"""
+        with self._lock:
+            return len(self._pending)
+
+    def _run(self):
+        while True:
+            key, func = self._queue.get()
+            try:
+                func()
+            except Exception:
+                pass  # the entry expires and the next caller reloads it
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
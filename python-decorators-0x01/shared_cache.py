@@ -0,0 +1,353 @@
+import base64
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from result_cache import QueryCache
+
+# Header byte flag for stored values
+_COMPRESSED = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key BLOB PRIMARY KEY,
+    value BLOB NOT NULL,
+    tables TEXT NOT NULL,
+    expires REAL,
+    created REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS entry_tables (
+    name TEXT NOT NULL,
+    key BLOB NOT NULL,
+    PRIMARY KEY (name, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS table_versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_entries_created ON entries (created);
+"""
+
+def hash_key(key):
+    """Stable 16-byte digest of a cache key, the same in every process"""
+    return hashlib.blake2b(repr(key).encode(), digest_size=16).digest()
+
+def _encode(value):
+    # Tuples, the usual row type, stay bare JSON arrays; the rarer lists,
+    # bytes and dicts are tagged so they come back as the same types
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, tuple):
+        return [_encode(item) for item in value]
+    if isinstance(value, list):
+        return {"L": [_encode(item) for item in value]}
+    if isinstance(value, bytes):
+        return {"B": base64.b64encode(value).decode("ascii")}
+    if isinstance(value, dict) and all(isinstance(k, str) for k in value):
+        return {"D": {k: _encode(v) for k, v in value.items()}}
+    raise TypeError(f"{type(value).__name__} results are not stored in L2")
+
+def _decode(value):
+    if isinstance(value, list):
+        return tuple(_decode(item) for item in value)
+    if isinstance(value, dict):
+        (tag, inner), = value.items()
+        if tag == "L":
+            return [_decode(item) for item in inner]
+        if tag == "B":
+            return base64.b64decode(inner)
+        if tag == "D":
+            return {k: _decode(v) for k, v in inner.items()}
+        raise ValueError(f"Unknown tag {tag!r} in stored value")
+    return value
+
+def dumps(value, compress_over=512, level=6):
+    """Serialize a result as compact JSON, compressed past `compress_over` bytes.
+
+    Only plain data round-trips: None, numbers, strings, bytes, and tuples,
+    lists and string-keyed dicts of them. Anything else, such as
+    sqlite3.Row, raises TypeError. The format is data only, so reading a
+    tampered store cannot run code the way unpickling could.
+    """
+    flags = 0
+    data = json.dumps(_encode(value), separators=(",", ":"),
+                      allow_nan=False).encode()
+    if len(data) > compress_over:
+        packed = zlib.compress(data, level)
+        if len(packed) < len(data):
+            data = packed
+            flags |= _COMPRESSED
+    return bytes([flags]) + data
+
+def loads(blob):
+    """Inverse of dumps(); raises ValueError for data it did not write"""
+    flags, data = blob[0], blob[1:]
+    if flags & ~_COMPRESSED:
+        raise ValueError(f"Unknown value format {flags}")
+    try:
+        if flags & _COMPRESSED:
+            data = zlib.decompress(data)
+        return _decode(json.loads(data))
+    except (zlib.error, TypeError, AttributeError) as err:
+        raise ValueError(f"Corrupt stored value: {err}") from err
+
+class SharedStore:
+    """Query results in a SQLite file shared by every process on the host.
+
+    Entries are keyed by a hash of the cache key and stored serialized and
+    compressed, with a wall-clock expiry so every process agrees on it.
+    Invalidating a table deletes its entries and bumps the table's version,
+    which TieredCache instances poll to drop their in-process copies. Once
+    more than `max_entries` are stored, the oldest are pruned first.
+    Storage errors such as a long-held lock are treated as misses, so the
+    shared tier can only ever slow a query down by its busy timeout.
+    Results dumps() cannot store stay out of L2 and are counted in
+    `skipped`. A new store file is created readable by its owner only.
+    """
+
+    def __init__(self, path, max_entries=100_000, compress_over=512,
+                 busy_timeout=1.0, prune_every=256):
+        self.path = path
+        self.max_entries = max_entries
+        self.compress_over = compress_over
+        self.busy_timeout = busy_timeout
+        self.prune_every = prune_every
+        self.errors = 0
+        self.skipped = 0
+        self._writes = 0
+        self._local = threading.local()
+        self._conns = []
+        self._lock = threading.Lock()
+        try:
+            # SQLite gives the -wal and -shm files the same permissions
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_RDWR, 0o600))
+        except FileExistsError:
+            pass
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                                   isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._conns.append(conn)
+        return conn
+
+    def _failed(self):
+        with self._lock:
+            self.errors += 1
+
+    def get(self, key):
+        """Return (found, value, tables, expires); expires is wall clock"""
+        try:
+            row = self._conn().execute(
+                "SELECT value, tables, expires FROM entries WHERE key = ?",
+                (hash_key(key),)).fetchone()
+        except sqlite3.Error:
+            self._failed()
+            return False, None, (), None
+        if row is None or (row[2] is not None and row[2] <= time.time()):
+            return False, None, (), None
+        blob, tables, expires = row
+        try:
+            value = loads(blob)
+        except ValueError:
+            self._failed()
+            return False, None, (), None
+        return True, value, tables.split(",") if tables else (), expires
+
+    def set(self, key, value, tables=(), ttl=None):
+        """Store a result for every process to reuse"""
+        digest = hash_key(key)
+        try:
+            blob = dumps(value, self.compress_over)
+        except (TypeError, ValueError):
+            with self._lock:
+                self.skipped += 1
+            return
+        now = time.time()
+        expires = None if ttl is None else now + ttl
+        try:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                             (digest, blob, ",".join(sorted(tables)),
+                              expires, now))
+                conn.executemany(
+                    "INSERT OR IGNORE INTO entry_tables VALUES (?, ?)",
+                    [(name, digest) for name in tables])
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error:
+            self._failed()
+            return
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.prune_every == 0
+        if prune:
+            self.prune()
+
+    def prune(self):
+        """Delete expired entries and the oldest ones beyond max_entries"""
+        try:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM entries WHERE expires <= ?",
+                             (time.time(),))
+                conn.execute("""
+                    DELETE FROM entries WHERE key IN (
+                        SELECT key FROM entries ORDER BY created DESC
+                        LIMIT -1 OFFSET ?)""", (self.max_entries,))
+                conn.execute("""
+                    DELETE FROM entry_tables WHERE key NOT IN (
+                        SELECT key FROM entries)""")
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error:
+            self._failed()
+
+    def invalidate_tables(self, tables):
+        """Drop entries reading from `tables` and bump their versions"""
+        tables = sorted(tables)
+        if not tables:
+            return
+        marks = ",".join("?" * len(tables))
+        try:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(f"""
+                    DELETE FROM entries WHERE key IN (
+                        SELECT key FROM entry_tables WHERE name IN ({marks}))
+                """, tables)
+                conn.execute(
+                    f"DELETE FROM entry_tables WHERE name IN ({marks})", tables)
+                conn.executemany("""
+                    INSERT INTO table_versions VALUES (?, 1)
+                    ON CONFLICT (name) DO UPDATE SET version = version + 1
+                """, [(name,) for name in tables])
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error:
+            self._failed()
+
+    def table_versions(self):
+        """{table: version} for every table invalidated so far"""
+        try:
+            return dict(self._conn().execute(
+                "SELECT name, version FROM table_versions"))
+        except sqlite3.Error:
+            self._failed()
+            return None
+
+    def clear(self):
+        """Drop every entry"""
+        conn = self._conn()
+        conn.execute("DELETE FROM entries")
+        conn.execute("DELETE FROM entry_tables")
+
+    def close(self):
+        """Close the store's connections"""
+        with self._lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            conn.close()
+        self._local = threading.local()
+
+class TieredCache(QueryCache):
+    """In-process LRU (L1) in front of a SharedStore (L2).
+
+    A miss in L1 is looked up in L2 and copied into L1 with the same
+    expiry, so a result computed by one worker is reused by the others.
+    Writes go to both tiers. Every `sync_interval` seconds a lookup checks
+    the store's table versions and drops L1 entries for tables another
+    process has invalidated, which bounds cross-process staleness.
+    Takes the QueryCache limits for L1 as keyword arguments.
+    """
+
+    def __init__(self, store, sync_interval=0.5, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+        self.sync_interval = sync_interval
+        self.l2_hits = 0
+        self._versions = store.table_versions() or {}
+        self._next_sync = time.monotonic() + sync_interval
+
+    def _sync(self):
+        now = time.monotonic()
+        if now < self._next_sync:
+            return
+        self._next_sync = now + self.sync_interval
+        versions = self.store.table_versions()
+        if versions is None:
+            return
+        changed = frozenset(name for name, version in versions.items()
+                            if self._versions.get(name) != version)
+        self._versions = versions
+        if changed:
+            super().invalidate_tables(changed)
+
+    def get(self, key, record=True):
+        """Return (found, value) from L1, falling back to L2"""
+        self._sync()
+        with self._lock:
+            found, value = super().get(key, record=False)
+            if found:
+                if record:
+                    self.hits += 1
+                return True, value
+        found, value, tables, expires = self.store.get(key)
+        with self._lock:
+            if not found:
+                if record:
+                    self.misses += 1
+                return False, None
+            ttl = None if expires is None else expires - time.time()
+            QueryCache.set(self, key, value, tables, ttl)
+            if record:
+                self.hits += 1
+                self.l2_hits += 1
+            return True, value
+
+    def set(self, key, value, tables=(), ttl=None, generations=None):
+        """Store a result in both tiers, unless it is stale (see QueryCache)"""
+        if generations is not None and not self.is_current(generations):
+            return False
+        super().set(key, value, tables, ttl, generations)
+        self.store.set(key, value, tables, self.ttl if ttl is None else ttl)
+        if generations is not None and not self.is_current(generations):
+            # The invalidation may have reached L2 before this write did
+            self.store.invalidate_tables(tables)
+            return False
+        return True
+
+    def invalidate_tables(self, tables):
+        """Drop entries for `tables` here, in L2 and, soon, in other processes"""
+        dropped = super().invalidate_tables(tables)
+        self.store.invalidate_tables(tables)
+        return dropped
+
+    def stats(self):
+        """QueryCache counters plus L2 hits and storage errors"""
+        stats = super().stats()
+        stats["l2_hits"] = self.l2_hits
+        stats["l2_errors"] = self.store.errors
+        stats["l2_skipped"] = self.store.skipped
+        return stats
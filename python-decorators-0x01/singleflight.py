@@ -0,0 +1,101 @@
+import asyncio
+import threading
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one execution.
+
+    The first thread to call do() for a key runs the function; threads
+    arriving while it is still running wait and receive the same result,
+    or the same exception. `shared` counts calls answered that way.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.shared = 0
+
+    def in_flight(self, key):
+        """Whether a call for `key` is running"""
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key, func):
+        """Return func(), running it at most once per key at a time"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = func()
+        except BaseException as err:
+            call.error = err
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+class AsyncSingleFlight:
+    """asyncio counterpart of SingleFlight, for use within one event loop.
+
+    Callers await a shared task instead of blocking a thread, so the loop
+    keeps serving other tasks while the query runs. A cancelled caller
+    stops waiting without cancelling the call for the rest. The caller
+    that started the call may have lent it resources, such as its
+    connection, so when cancelled it only re-raises once the call ends.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.shared = 0
+
+    def in_flight(self, key):
+        """Whether a call for `key` is running"""
+        return key in self._calls
+
+    async def do(self, key, func):
+        """Return await func(), running it at most once per key at a time"""
+        task = self._calls.get(key)
+        leader = task is None
+        if leader:
+            # The call runs as its own task, so cancelling whichever caller
+            # started it does not cancel it for the others
+            task = self._calls[key] = asyncio.ensure_future(func())
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            self.shared += 1
+        try:
+            # Shield so a cancelled caller only stops waiting
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # func may still be using what the leader passed it
+            while leader and not task.done():
+                try:
+                    await asyncio.wait((task,))
+                except asyncio.CancelledError:
+                    pass
+            raise
+
+    def _finished(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark it retrieved so a failure nobody awaited does not warn
+            task.exception()
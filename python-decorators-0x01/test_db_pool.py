@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""Unit tests for db_pool and the pooled with_db_connection"""
+
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+import db_pool
+from db_pool import ConnectionPool
+
+with_db_connection = __import__('1-with_db_connection').with_db_connection
+
+
+class PoolTestCase(unittest.TestCase):
+    """Creates a throwaway users database per test"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.tmp.name, "users.db")
+        conn = sqlite3.connect(self.database)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.execute("INSERT INTO users (name) VALUES ('Ada')")
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+
+class TestConnectionPool(PoolTestCase):
+    """Tests for ConnectionPool"""
+
+    def test_reuses_connections(self):
+        """A released connection is handed out again"""
+        pool = ConnectionPool(self.database, max_size=2)
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            self.assertIs(second, first)
+        pool.close()
+
+    def test_bounded_size_times_out(self):
+        """Borrowing past max_size waits, then raises TimeoutError"""
+        pool = ConnectionPool(self.database, max_size=1, timeout=0.05)
+        with pool.connection():
+            with self.assertRaises(TimeoutError):
+                pool.acquire()
+        with pool.connection():
+            pass
+        pool.close()
+
+    def test_rolls_back_on_return(self):
+        """An uncommitted write does not leak to the next borrower"""
+        pool = ConnectionPool(self.database, max_size=1)
+        with pool.connection() as conn:
+            conn.execute("INSERT INTO users (name) VALUES ('Bob')")
+            conn.row_factory = sqlite3.Row
+        with pool.connection() as conn:
+            self.assertIsNone(conn.row_factory)
+            count = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+            self.assertEqual(count, 1)
+        pool.close()
+
+    def test_replaces_unhealthy_connection(self):
+        """A connection that fails the health check is swapped out"""
+        pool = ConnectionPool(self.database, max_size=1)
+        with pool.connection() as conn:
+            pass
+        conn.close()
+        with pool.connection() as fresh:
+            self.assertIsNot(fresh, conn)
+            self.assertEqual(fresh.execute("SELECT 1").fetchone(), (1,))
+        pool.close()
+
+    def test_per_thread_connections(self):
+        """Each thread keeps its own connection in per-thread mode"""
+        pool = ConnectionPool(self.database, per_thread=True)
+        seen = []
+
+        def borrow_twice():
+            with pool.connection() as a:
+                pass
+            with pool.connection() as b:
+                pass
+            seen.append((a, b))
+
+        threads = [threading.Thread(target=borrow_twice) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        (a1, b1), (a2, b2) = seen
+        self.assertIs(a1, b1)
+        self.assertIs(a2, b2)
+        self.assertIsNot(a1, a2)
+        pool.close()
+
+
+class TestPooledDecorator(PoolTestCase):
+    """Tests for with_db_connection in pooled mode"""
+
+    def test_explicit_pool(self):
+        """pool= makes every call borrow from that pool"""
+        pool = ConnectionPool(self.database, max_size=1)
+        seen = []
+
+        @with_db_connection(database=self.database, pool=pool)
+        def get_name(conn, user_id):
+            seen.append(conn)
+            return conn.execute("SELECT name FROM users WHERE id = ?",
+                                (user_id,)).fetchone()
+
+        self.assertEqual(get_name(1), ("Ada",))
+        self.assertEqual(get_name(user_id=1), ("Ada",))
+        self.assertIs(seen[0], seen[1])
+        pool.close()
+
+    def test_default_pool(self):
+        """Bare decorators use the default pool for the same database"""
+        pool = ConnectionPool(self.database, max_size=1)
+        db_pool.set_default_pool(pool)
+        self.addCleanup(db_pool.set_default_pool, None)
+        seen = []
+
+        @with_db_connection(database=self.database)
+        def get_conn(conn):
+            seen.append(conn)
+
+        get_conn()
+        get_conn()
+        self.assertIs(seen[0], seen[1])
+        pool.close()
+
+    def test_nested_read_inside_transaction(self):
+        """A nested pooled call keeps the outer transaction open"""
+        transactional = __import__('2-transactional').transactional
+        pool = ConnectionPool(self.database, per_thread=True)
+
+        @with_db_connection(database=self.database, pool=pool)
+        def count_users(conn):
+            return conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+        @with_db_connection(database=self.database, pool=pool)
+        @transactional
+        def add_user(conn, name):
+            conn.execute("INSERT INTO users (name) VALUES (?)", (name,))
+            return count_users()
+
+        self.assertEqual(add_user("Bob"), 2)
+        self.assertEqual(count_users(), 2)
+        pool.close()
+
+    def test_async_waits_off_the_event_loop(self):
+        """Coroutines queue for a full pool without freezing the loop"""
+        pool = ConnectionPool(self.database, max_size=1, timeout=1.0)
+
+        @with_db_connection(database=self.database, pool=pool)
+        async def hold(conn):
+            await asyncio.sleep(0.1)
+            return conn
+
+        async def main():
+            return await asyncio.gather(hold(), hold())
+
+        started = time.monotonic()
+        first, second = asyncio.run(main())
+        self.assertLess(time.monotonic() - started, 0.8)
+        self.assertIs(first, second)
+        pool.close()
+
+    def test_async_bypasses_per_thread_pool(self):
+        """Coroutines on one loop do not share a per-thread connection"""
+        pool = ConnectionPool(self.database, per_thread=True)
+        seen = []
+
+        @with_db_connection(database=self.database, pool=pool)
+        async def add_user(conn, name):
+            seen.append(conn)
+            conn.execute("INSERT INTO users (name) VALUES (?)", (name,))
+            conn.commit()
+
+        @with_db_connection(database=self.database, pool=pool)
+        async def abandon(conn):
+            seen.append(conn)
+            await asyncio.sleep(0.05)
+            conn.rollback()
+
+        async def main():
+            await asyncio.gather(abandon(), add_user("Bob"))
+
+        asyncio.run(main())
+        self.assertIsNot(seen[0], seen[1])
+        conn = sqlite3.connect(self.database)
+        self.assertEqual(
+            conn.execute("SELECT COUNT(*) FROM users").fetchone()[0], 2)
+        conn.close()
+        pool.close()
+
+    def test_unpooled_closes_connection(self):
+        """Without a pool each call opens and closes its own connection"""
+        seen = []
+
+        @with_db_connection(database=self.database)
+        def get_conn(conn):
+            seen.append(conn)
+
+        get_conn()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            seen[0].execute("SELECT 1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""Unit tests for group-commit transactional writes"""
+
+import io
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import redirect_stdout
+
+from group_commit import GroupCommitter
+from result_cache import QueryCache
+
+transactional = __import__('2-transactional').transactional
+
+
+class TestGroupCommit(unittest.TestCase):
+    """Tests for transactional(group_commit=...)"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.tmp.name, "users.db")
+        conn = sqlite3.connect(self.database)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, "
+                     "email TEXT NOT NULL UNIQUE)")
+        conn.executemany("INSERT INTO users (email) VALUES (?)",
+                         [(f"user{i}@example.com",) for i in range(1, 51)])
+        conn.commit()
+        conn.close()
+        self.committer = GroupCommitter(self.database, window=0.05)
+
+        @transactional(group_commit=self.committer)
+        def update_email(conn, user_id, new_email):
+            conn.execute("UPDATE users SET email = ? WHERE id = ?",
+                         (new_email, user_id))
+            return user_id
+
+        self.update_email = update_email
+
+    def tearDown(self):
+        self.committer.close()
+        self.tmp.cleanup()
+
+    def emails(self):
+        conn = sqlite3.connect(self.database)
+        try:
+            return dict(conn.execute("SELECT id, email FROM users"))
+        finally:
+            conn.close()
+
+    def run_concurrently(self, calls):
+        """Run (args) calls on their own threads; return results/errors"""
+        outcomes = [None] * len(calls)
+        barrier = threading.Barrier(len(calls))
+
+        def call(i, args):
+            barrier.wait()
+            try:
+                outcomes[i] = self.update_email(*args)
+            except Exception as err:
+                outcomes[i] = err
+
+        threads = [threading.Thread(target=call, args=(i, args))
+                   for i, args in enumerate(calls)]
+        with redirect_stdout(io.StringIO()):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        return outcomes
+
+    def test_batches_concurrent_calls(self):
+        """Concurrent calls share commits and all land"""
+        outcomes = self.run_concurrently(
+            [(i, f"new{i}@example.com") for i in range(1, 21)])
+        self.assertEqual(outcomes, list(range(1, 21)))
+        self.assertEqual(self.committer.calls, 20)
+        self.assertLess(self.committer.batches, 20)
+        emails = self.emails()
+        self.assertEqual(emails[7], "new7@example.com")
+
+    def test_failed_call_rolls_back_alone(self):
+        """A call that raises is undone; the rest of its batch commits"""
+        outcomes = self.run_concurrently([
+            (1, "fresh1@example.com"),
+            (2, "user3@example.com"),  # violates UNIQUE
+            (4, "fresh4@example.com"),
+        ])
+        self.assertEqual(outcomes[0], 1)
+        self.assertIsInstance(outcomes[1], sqlite3.IntegrityError)
+        self.assertEqual(outcomes[2], 4)
+        emails = self.emails()
+        self.assertEqual(emails[1], "fresh1@example.com")
+        self.assertEqual(emails[2], "user2@example.com")
+        self.assertEqual(emails[4], "fresh4@example.com")
+
+    def test_partial_writes_in_failed_call_are_undone(self):
+        """Earlier statements of a failing call do not survive"""
+        @transactional(group_commit=self.committer)
+        def half_done(conn):
+            conn.execute("UPDATE users SET email = 'x@example.com' WHERE id = 1")
+            raise ValueError("boom")
+
+        with redirect_stdout(io.StringIO()), self.assertRaises(ValueError):
+            half_done()
+        self.assertEqual(self.emails()[1], "user1@example.com")
+
+    def test_invalidates_cache_after_commit(self):
+        """Committed group writes invalidate cached reads of the table"""
+        cache = QueryCache()
+        cache.set("users", [1], tables={"users"})
+        cache.set("orders", [2], tables={"orders"})
+        self.update_email(1, "cached@example.com")
+        self.assertNotIn("users", cache)
+        self.assertIn("orders", cache)
+
+    def test_same_sql_after_failed_call_invalidates(self):
+        """A call reusing a failed call's statement still invalidates"""
+        cache = QueryCache()
+        cache.set("users", [1], tables={"users"})
+
+        def update_email(conn, user_id, new_email):
+            conn.execute("UPDATE users SET email = ? WHERE id = ?",
+                         (new_email, user_id))
+
+        failing = self.committer.submit(update_email, 2, "user3@example.com")
+        passing = self.committer.submit(update_email, 4, "fresh4@example.com")
+        with self.assertRaises(sqlite3.IntegrityError):
+            failing.result(timeout=5)
+        passing.result(timeout=5)
+        self.assertEqual(self.committer.batches, 1)
+        self.assertEqual(self.emails()[4], "fresh4@example.com")
+        self.assertNotIn("users", cache)
+
+    def test_writer_death_fails_queued_calls_and_restarts(self):
+        """Calls queued behind a dead writer fail; later calls still run"""
+        committer = GroupCommitter(self.database, window=0)
+        self.addCleanup(committer.close)
+        release = threading.Event()
+
+        def die(conn):
+            release.wait(5)
+            raise SystemExit("writer killed")
+
+        def count(conn):
+            return conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+        dying = committer.submit(die)
+        time.sleep(0.05)  # let the writer take the first call alone
+        queued = committer.submit(count)
+        release.set()
+        with self.assertRaises(SystemExit):
+            dying.result(timeout=5)
+        with self.assertRaises(RuntimeError):
+            queued.result(timeout=5)
+        self.assertEqual(committer.call(count), 50)
+
+    def test_call_times_out(self):
+        """call() gives up after the committer's timeout"""
+        committer = GroupCommitter(self.database, window=0, timeout=0.05)
+        self.addCleanup(committer.close)
+        release = threading.Event()
+        committer.submit(lambda conn: release.wait(5))
+        try:
+            with self.assertRaises(FutureTimeoutError):
+                committer.call(lambda conn: None)
+        finally:
+            release.set()
+
+    def test_call_waits_for_a_running_batch(self):
+        """A call whose batch already started is not reported as timed out"""
+        committer = GroupCommitter(self.database, window=0, timeout=0.05)
+        self.addCleanup(committer.close)
+
+        def slow_update(conn):
+            time.sleep(0.2)
+            conn.execute("UPDATE users SET email = 'slow@example.com' "
+                         "WHERE id = 1")
+            return "done"
+
+        self.assertEqual(committer.call(slow_update), "done")
+        self.assertEqual(self.emails()[1], "slow@example.com")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Unit tests for query_log and the log_queries decorator"""
+
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from query_log import QueryLogger
+
+log_queries = __import__('0-log_queries').log_queries
+
+
+class TestLogQueries(unittest.TestCase):
+    """Tests for log_queries"""
+
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY)")
+        self.conn.executemany("INSERT INTO users VALUES (?)", [(1,), (2,)])
+        self.stream = io.StringIO()
+        self.logger = QueryLogger(self.stream)
+
+    def tearDown(self):
+        self.logger.close()
+        self.conn.close()
+
+    def records(self):
+        self.logger.flush()
+        return [json.loads(line) for line in self.stream.getvalue().splitlines()]
+
+    def test_structured_record(self):
+        """SQL, parameters, duration and row count are logged as JSON"""
+        @log_queries(logger=self.logger)
+        def fetch(query, params=()):
+            return self.conn.execute(query, params).fetchall()
+
+        fetch("SELECT * FROM users WHERE id > ?", (0,))
+        [record] = self.records()
+        self.assertEqual(record["sql"], "SELECT * FROM users WHERE id > ?")
+        self.assertEqual(record["params"], [0])
+        self.assertEqual(record["rows"], 2)
+        self.assertEqual(record["function"], fetch.__qualname__)
+        self.assertGreaterEqual(record["duration_ms"], 0)
+
+    def test_sampling_keeps_slow_and_failed_queries(self):
+        """Sampled-out calls are skipped unless slow or failing"""
+        @log_queries(logger=self.logger, sample_rate=0.0, slow_threshold=0.02)
+        def fetch(query, delay=0):
+            time.sleep(delay)
+            return self.conn.execute(query).fetchall()
+
+        for _ in range(10):
+            fetch("SELECT 1")
+        fetch("SELECT 2", delay=0.03)
+        with self.assertRaises(sqlite3.OperationalError):
+            fetch("SELECT * FROM missing")
+        records = self.records()
+        self.assertEqual([r["sql"] for r in records],
+                         ["SELECT 2", "SELECT * FROM missing"])
+        self.assertTrue(records[0]["slow"])
+        self.assertIn("no such table", records[1]["error"])
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        """Records beyond max_queue are counted as dropped"""
+        logger = QueryLogger(io.StringIO(), max_queue=0)
+        self.assertFalse(logger.record({"sql": "SELECT 1"}))
+        self.assertEqual(logger.dropped, 1)
+        logger.close()
+
+    def test_close_writes_pending_records(self):
+        """Closing drains the queue to the stream"""
+        for i in range(1000):
+            self.logger.record({"i": i})
+        self.logger.close()
+        self.assertEqual(len(self.stream.getvalue().splitlines()), 1000)
+
+    def test_write_errors_do_not_stop_the_writer(self):
+        """A failing stream is counted and flush() still returns"""
+        class BrokenStream(io.StringIO):
+            def write(self, text):
+                raise OSError("disk full")
+
+        logger = QueryLogger(BrokenStream())
+        logger.record({"sql": "SELECT 1"})
+        logger.flush()
+        logger.record({"sql": "SELECT 2"})
+        logger.flush()
+        self.assertEqual(logger.errors, 2)
+        self.assertEqual(logger.written, 0)
+        logger.close()
+
+    def test_records_after_close_are_ignored(self):
+        """record() is a no-op once the logger has closed its stream"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "queries.log")
+            logger = QueryLogger(path)
+            logger.record({"sql": "SELECT 1"})
+            logger.close()
+            self.assertFalse(logger.record({"sql": "SELECT 2"}))
+            logger.flush()
+            with open(path) as file:
+                self.assertEqual(len(file.readlines()), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
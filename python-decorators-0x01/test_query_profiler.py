@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Unit tests for query_profiler"""
+
+import sqlite3
+import unittest
+from unittest.mock import patch
+
+from query_profiler import (LatencyHistogram, QueryProfiler, normalize_sql,
+                            profile_queries)
+
+transactional = __import__('2-transactional').transactional
+
+
+class TestNormalizeSql(unittest.TestCase):
+    """Tests for normalize_sql"""
+
+    def test_literals_and_lists(self):
+        """Literals, IN lists and whitespace are collapsed"""
+        self.assertEqual(
+            normalize_sql("SELECT * FROM t1 WHERE a = 'x''y'\n  AND b IN (1, 2.5, -3);"),
+            "SELECT * FROM t1 WHERE a = ? AND b IN (?)")
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    """Tests for LatencyHistogram"""
+
+    def test_percentiles(self):
+        """Percentiles land on bucket bounds, capped at the max"""
+        hist = LatencyHistogram()
+        for _ in range(90):
+            hist.add(0.0008)
+        for _ in range(10):
+            hist.add(0.3)
+        self.assertEqual(hist.percentile(50), 0.001)
+        self.assertEqual(hist.percentile(95), 0.3)
+        self.assertEqual(hist.count, 100)
+        self.assertAlmostEqual(hist.total, 3.072)
+
+
+class TestProfileQueries(unittest.TestCase):
+    """Tests for profile_queries on a real connection"""
+
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute(
+            "CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT)")
+        self.conn.executemany("INSERT INTO users (email) VALUES (?)",
+                              [(f"user{i}@example.com",) for i in range(500)])
+        self.conn.commit()
+        self.profiler = QueryProfiler(slow_threshold=0)
+
+        @profile_queries(profiler=self.profiler)
+        def by_email(conn, email):
+            return conn.execute("SELECT id FROM users WHERE email = ?",
+                                (email,)).fetchall()
+
+        @profile_queries(profiler=self.profiler)
+        def by_id(conn, user_id):
+            return conn.execute("SELECT email FROM users WHERE id = ?",
+                                (user_id,)).fetchall()
+
+        self.by_email = by_email
+        self.by_id = by_id
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_groups_by_normalized_sql(self):
+        """Calls with different parameters share one profile"""
+        for i in range(5):
+            self.by_id(self.conn, i)
+        [profile] = self.profiler.top()
+        self.assertEqual(profile.sql, "SELECT email FROM users WHERE id = ?")
+        self.assertEqual(profile.histogram.count, 5)
+
+    def test_flags_full_scans(self):
+        """Unindexed lookups are flagged, primary key lookups are not"""
+        self.by_email(self.conn, "user1@example.com")
+        self.by_id(self.conn, 1)
+        profiles = {p.sql: p for p in self.profiler.top()}
+        email = profiles["SELECT id FROM users WHERE email = ?"]
+        by_id = profiles["SELECT email FROM users WHERE id = ?"]
+        self.assertEqual(email.full_scans, ("users",))
+        self.assertFalse(by_id.full_scan)
+        self.assertTrue(any(d.startswith("SEARCH") for d in by_id.plan))
+
+    def test_explains_once(self):
+        """EXPLAIN QUERY PLAN runs only for the first slow execution"""
+        with patch.object(self.profiler, "explain",
+                          wraps=self.profiler.explain) as explain:
+            for _ in range(3):
+                self.by_email(self.conn, "user1@example.com")
+        self.assertEqual(explain.call_count, 1)
+
+    def test_fast_queries_are_not_explained(self):
+        """Statements under the threshold get no plan"""
+        self.profiler.slow_threshold = 60
+        self.by_email(self.conn, "user1@example.com")
+        self.assertIsNone(self.profiler.top()[0].plan)
+
+    def test_writes_and_commits_are_profiled(self):
+        """Every statement is recorded, including the implicit BEGIN"""
+        @profile_queries(profiler=self.profiler)
+        @transactional
+        def rename(conn, user_id, email):
+            conn.execute("UPDATE users SET email = ? WHERE id = ?",
+                         (email, user_id))
+
+        rename(self.conn, 1, "new@example.com")
+        sqls = {p.sql for p in self.profiler.top()}
+        self.assertIn("UPDATE users SET email = ? WHERE id = ?", sqls)
+        self.assertIn("BEGIN", sqls)
+        self.assertIn("COMMIT", sqls)
+
+    def test_report(self):
+        """The report lists statements by total time with plans"""
+        self.by_email(self.conn, "user1@example.com")
+        report = self.profiler.report(5)
+        self.assertIn("FULL", report)
+        self.assertIn("-> SCAN users", report)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""Unit tests for result_cache and the cache_query decorator"""
+
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from result_cache import QueryCache, approximate_size, make_key, tables_in
+
+cache_module = __import__('4-cache_query')
+transactional = __import__('2-transactional').transactional
+with_db_connection = __import__('1-with_db_connection').with_db_connection
+
+
+class TestQueryCache(unittest.TestCase):
+    """Tests for QueryCache"""
+
+    def test_lru_eviction_by_count(self):
+        """The least recently used entry goes first"""
+        cache = QueryCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_eviction_by_bytes(self):
+        """Entries are evicted once their total size passes max_bytes"""
+        cache = QueryCache(max_bytes=100)
+        cache.set("a", "x" * 60)
+        cache.set("b", "y" * 60)
+        self.assertEqual(len(cache), 1)
+        self.assertLessEqual(cache.nbytes, 100)
+        cache.set("huge", "z" * 1000)
+        self.assertNotIn("huge", cache)
+
+    def test_ttl_expiry(self):
+        """Entries past their TTL are misses"""
+        cache = QueryCache()
+        cache.set("a", 1, ttl=0.01)
+        cache.set("b", 2)
+        time.sleep(0.02)
+        self.assertEqual(cache.get("a"), (False, None))
+        self.assertEqual(cache.get("b"), (True, 2))
+
+    def test_invalidate_tables(self):
+        """Only entries reading from a written table are dropped"""
+        cache = QueryCache()
+        cache.set("users", 1, tables={"users"})
+        cache.set("orders", 2, tables={"orders"})
+        self.assertEqual(cache.invalidate_tables(frozenset({"users"})), 1)
+        self.assertNotIn("users", cache)
+        self.assertIn("orders", cache)
+
+    def test_comma_join_invalidated_by_either_table(self):
+        """A write to any table of a comma join drops the cached result"""
+        cache = QueryCache()
+        query = "SELECT * FROM users u, orders o WHERE u.id = o.user_id"
+        cache.set(query, [1], tables=tables_in(query))
+        cache.invalidate_tables(frozenset({"orders"}))
+        self.assertNotIn(query, cache)
+
+    def test_helpers(self):
+        """Keys include parameters; tables are parsed from the SQL"""
+        self.assertNotEqual(make_key("q", ([1],)), make_key("q", ([2],)))
+        self.assertEqual(make_key("q", ([1],)), make_key("q", ((1,),)))
+        self.assertEqual(
+            tables_in('SELECT * FROM Users u JOIN "orders" o ON 1'),
+            {"users", "orders"})
+        self.assertEqual(
+            tables_in("SELECT * FROM users u, main.orders o, "
+                      "(SELECT id FROM payments) p WHERE u.id = o.uid"),
+            {"users", "orders", "payments"})
+        self.assertEqual(
+            tables_in("SELECT * FROM users u JOIN orders o ON (u.id = o.uid), "
+                      "[audit] WHERE u.name = 'x, y'"),
+            {"users", "orders", "audit"})
+        self.assertEqual(approximate_size([("ab", 1)]), 8 + 8 + 2 + 8 + 8)
+
+
+class TestCacheQuery(unittest.TestCase):
+    """Tests for cache_query with a real database"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.tmp.name, "users.db")
+        conn = sqlite3.connect(self.database)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT NOT NULL UNIQUE)")
+        conn.executemany("INSERT INTO users (email) VALUES (?)",
+                         [("a@example.com",), ("b@example.com",)])
+        conn.commit()
+        conn.close()
+        self.cache = QueryCache()
+        self.executions = 0
+
+        @with_db_connection(database=self.database)
+        @cache_module.cache_query(cache=self.cache)
+        def fetch(conn, query, params=()):
+            self.executions += 1
+            return conn.execute(query, params).fetchall()
+
+        @with_db_connection(database=self.database)
+        @transactional
+        def update_email(conn, user_id, new_email):
+            conn.execute("UPDATE users SET email = ? WHERE id = ?",
+                         (new_email, user_id))
+
+        self.fetch = fetch
+        self.update_email = update_email
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parameters_are_part_of_the_key(self):
+        """Different bound parameters are cached separately"""
+        query = "SELECT email FROM users WHERE id = ?"
+        self.assertEqual(self.fetch(query, (1,)), [("a@example.com",)])
+        self.assertEqual(self.fetch(query, (2,)), [("b@example.com",)])
+        self.assertEqual(self.fetch(query, (1,)), [("a@example.com",)])
+        self.assertEqual(self.executions, 2)
+
+    def test_transactional_write_invalidates(self):
+        """A committed write drops cached reads of that table"""
+        query = "SELECT email FROM users WHERE id = ?"
+        self.fetch(query, (1,))
+        self.update_email(1, "new@example.com")
+        self.assertEqual(self.fetch(query, (1,)), [("new@example.com",)])
+        self.assertEqual(self.executions, 2)
+
+    def test_rolled_back_write_keeps_cache(self):
+        """A failed transaction leaves cached results alone"""
+        query = "SELECT email FROM users WHERE id = ?"
+        self.fetch(query, (1,))
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.update_email(1, "b@example.com")
+        self.assertEqual(self.fetch(query, (1,)), [("a@example.com",)])
+        self.assertEqual(self.executions, 1)
+
+
+    def test_write_during_read_is_not_cached(self):
+        """A read overtaken by a committed write is not cached"""
+        query = "SELECT email FROM users WHERE id = ?"
+
+        @with_db_connection(database=self.database)
+        @cache_module.cache_query(cache=self.cache)
+        def racing_fetch(conn, query, params=()):
+            rows = conn.execute(query, params).fetchall()
+            self.update_email(1, "new@example.com")
+            return rows
+
+        self.assertEqual(racing_fetch(query, (1,)), [("a@example.com",)])
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(racing_fetch(query, (1,)), [("new@example.com",)])
+
+    def test_functions_do_not_share_entries(self):
+        """Two functions running the same SQL are cached separately"""
+        query = "SELECT email FROM users WHERE id = ?"
+
+        @with_db_connection(database=self.database)
+        @cache_module.cache_query(cache=self.cache)
+        def count(conn, query, params=()):
+            return len(conn.execute(query, params).fetchall())
+
+        self.assertEqual(self.fetch(query, (1,)), [("a@example.com",)])
+        self.assertEqual(count(query, (1,)), 1)
+        self.assertEqual(self.fetch(query, (1,)), [("a@example.com",)])
+
+
+class TestRefreshAhead(unittest.TestCase):
+    """Tests for cache_query(refresh_ahead=...)"""
+
+    QUERY = "SELECT email FROM users WHERE id = 1"
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.tmp.name, "users.db")
+        conn = sqlite3.connect(self.database)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT)")
+        conn.execute("INSERT INTO users (email) VALUES ('a@example.com')")
+        conn.commit()
+        conn.close()
+        self.cache = QueryCache()
+        self.executions = 0
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def change_email(self, email):
+        """Write behind the cache's back, so only a reload can see it"""
+        conn = sqlite3.connect(self.database)
+        conn.execute("UPDATE users SET email = ?", (email,))
+        conn.commit()
+        conn.close()
+
+    def wait_for_refreshes(self, count):
+        deadline = time.monotonic() + 2
+        while self.cache.refreshes < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_refreshes_in_background(self):
+        """A hit near expiry returns the cached value and reloads it"""
+        @with_db_connection(database=self.database)
+        @cache_module.cache_query(cache=self.cache, ttl=0.4,
+                                  refresh_ahead=0.5, database=self.database)
+        def fetch(conn, query):
+            self.executions += 1
+            return conn.execute(query).fetchall()
+
+        self.assertEqual(fetch(self.QUERY), [("a@example.com",)])
+        self.change_email("b@example.com")
+        self.assertEqual(fetch(self.QUERY), [("a@example.com",)])
+        self.assertEqual(self.cache.refreshes, 0)
+        time.sleep(0.25)
+        # Still valid, so served from cache while the refresh is queued
+        self.assertEqual(fetch(self.QUERY), [("a@example.com",)])
+        self.wait_for_refreshes(1)
+        self.assertEqual(fetch(self.QUERY), [("b@example.com",)])
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (3, 1))
+        self.assertEqual(stats["refreshes"], 1)
+        self.assertEqual(self.executions, 2)
+
+    def test_requires_refresh_connection(self):
+        """refresh_ahead without database or pool is rejected up front"""
+        with self.assertRaises(ValueError):
+            cache_module.cache_query(ttl=1, refresh_ahead=0.5)(
+                lambda conn, query: [])
+
+    def test_async_refreshes_in_background(self):
+        """Coroutine functions refresh on the event loop"""
+        @with_db_connection(database=self.database)
+        @cache_module.cache_query(cache=self.cache, ttl=0.2,
+                                  refresh_ahead=0.5, database=self.database)
+        async def fetch(conn, query):
+            self.executions += 1
+            return conn.execute(query).fetchall()
+
+        async def main():
+            first = await fetch(self.QUERY)
+            self.change_email("b@example.com")
+            await asyncio.sleep(0.15)
+            stale = await fetch(self.QUERY)
+            while self.cache.refreshes < 1:
+                await asyncio.sleep(0.01)
+            return first, stale, await fetch(self.QUERY)
+
+        first, stale, fresh = asyncio.run(asyncio.wait_for(main(), 2))
+        self.assertEqual(first, stale)
+        self.assertEqual(fresh, [("b@example.com",)])
+        self.assertEqual(self.executions, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Unit tests for retry_on_failure"""
+
+import asyncio
+import io
+import sqlite3
+import time
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+retry_module = __import__('3-retry_on_failure')
+retry_on_failure = retry_module.retry_on_failure
+is_transient = retry_module.is_transient
+
+
+def flaky(failures, error):
+    """Function failing `failures` times with `error`, then returning 'ok'"""
+    calls = []
+
+    def func():
+        calls.append(time.monotonic())
+        if len(calls) <= failures:
+            raise error
+        return "ok"
+    return func, calls
+
+
+class TestRetryOnFailure(unittest.TestCase):
+    """Tests for retry_on_failure"""
+
+    def setUp(self):
+        quiet = redirect_stdout(io.StringIO())
+        quiet.__enter__()
+        self.addCleanup(quiet.__exit__, None, None, None)
+
+    def test_classifies_errors(self):
+        """Lock contention is transient; syntax errors are not"""
+        self.assertTrue(is_transient(
+            sqlite3.OperationalError("database is locked")))
+        self.assertFalse(is_transient(
+            sqlite3.OperationalError('near "SELEC": syntax error')))
+        self.assertFalse(is_transient(ValueError("database is locked")))
+
+    def test_real_lock_is_transient(self):
+        """An actual SQLITE_BUSY from a competing writer is retried"""
+        conn = sqlite3.connect("file:busy?mode=memory&cache=shared", uri=True,
+                               timeout=0)
+        other = sqlite3.connect("file:busy?mode=memory&cache=shared", uri=True,
+                                timeout=0)
+        conn.execute("CREATE TABLE t (x)")
+        conn.execute("BEGIN EXCLUSIVE")
+        with self.assertRaises(sqlite3.OperationalError) as caught:
+            other.execute("SELECT * FROM t")
+        self.assertTrue(is_transient(caught.exception))
+        conn.rollback()
+        conn.close()
+        other.close()
+
+    def test_retries_transient_errors(self):
+        """Transient failures are retried until the call succeeds"""
+        func, calls = flaky(2, sqlite3.OperationalError("database is locked"))
+        wrapped = retry_on_failure(retries=3, delay=0.001)(func)
+        self.assertEqual(wrapped(), "ok")
+        self.assertEqual(len(calls), 3)
+
+    def test_permanent_errors_are_not_retried(self):
+        """A syntax error is raised after a single attempt"""
+        func, calls = flaky(5, sqlite3.OperationalError("syntax error"))
+        with self.assertRaises(sqlite3.OperationalError):
+            retry_on_failure(retries=5, delay=0.001)(func)()
+        self.assertEqual(len(calls), 1)
+
+    def test_gives_up_after_retries(self):
+        """The last error is raised once attempts run out"""
+        func, calls = flaky(5, sqlite3.OperationalError("database is locked"))
+        with self.assertRaises(sqlite3.OperationalError):
+            retry_on_failure(retries=3, delay=0.001)(func)()
+        self.assertEqual(len(calls), 3)
+
+    def test_full_jitter_capped_backoff(self):
+        """Waits are drawn from [0, min(max_delay, delay * 2**n)]"""
+        func, _ = flaky(4, sqlite3.OperationalError("database is locked"))
+        wrapped = retry_on_failure(retries=5, delay=1, max_delay=3)(func)
+        with patch.object(retry_module.random, "uniform",
+                          return_value=0) as uniform, \
+                patch.object(retry_module.time, "sleep") as sleep:
+            self.assertEqual(wrapped(), "ok")
+        self.assertEqual([c.args for c in uniform.call_args_list],
+                         [(0, 1), (0, 2), (0, 3), (0, 3)])
+        self.assertEqual(sleep.call_count, 4)
+
+    def test_deadline_stops_retrying(self):
+        """No retry starts once it would overrun the deadline"""
+        func, calls = flaky(100, sqlite3.OperationalError("database is busy"))
+        wrapped = retry_on_failure(retries=100, delay=0.02, max_delay=0.02,
+                                   deadline=0.1)(func)
+        start = time.monotonic()
+        with self.assertRaises(sqlite3.OperationalError):
+            wrapped()
+        self.assertLess(time.monotonic() - start, 0.15)
+        self.assertLess(len(calls), 100)
+
+    def test_async_does_not_block_loop(self):
+        """The asyncio variant yields to other tasks while backing off"""
+        attempts = []
+
+        @retry_on_failure(retries=3, delay=0.05, max_delay=0.05)
+        async def locked_then_ok():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise sqlite3.OperationalError("database is locked")
+            return "ok"
+
+        async def ticker(ticks):
+            while True:
+                ticks.append(1)
+                await asyncio.sleep(0.005)
+
+        async def main():
+            ticks = []
+            task = asyncio.ensure_future(ticker(ticks))
+            with patch.object(retry_module.random, "uniform",
+                              side_effect=lambda low, high: high):
+                result = await locked_then_ok()
+            task.cancel()
+            return result, ticks
+
+        result, ticks = asyncio.run(main())
+        self.assertEqual(result, "ok")
+        self.assertEqual(len(attempts), 3)
+        self.assertGreater(len(ticks), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Unit tests for the tiered L1/L2 query cache"""
+
+import os
+import pickle
+import sqlite3
+import stat
+import tempfile
+import time
+import unittest
+
+import result_cache
+from shared_cache import SharedStore, TieredCache, dumps, loads
+
+cache_query = __import__('4-cache_query').cache_query
+with_db_connection = __import__('1-with_db_connection').with_db_connection
+
+QUERY = "SELECT email FROM users WHERE id = ?"
+
+
+class TestSerialization(unittest.TestCase):
+    """Tests for dumps and loads"""
+
+    def test_round_trip(self):
+        """Rows survive, large results are compressed"""
+        small = [(1, "a@example.com", None, 2.5, b"\x00")]
+        self.assertEqual(loads(dumps(small)), small)
+        large = [(i, "user@example.com") for i in range(1000)]
+        blob = dumps(large)
+        self.assertTrue(blob[0] & 1)
+        self.assertLess(len(blob), len(dumps(large, compress_over=10**9)))
+        self.assertEqual(loads(blob), large)
+
+    def test_types_round_trip(self):
+        """Tuples, lists, bytes and dicts come back as the same types"""
+        value = [(1, [2, "x"], {"k": b"\xff"}, None, True, -1.5)]
+        self.assertEqual(loads(dumps(value)), value)
+
+    def test_only_plain_data_is_stored(self):
+        """Other objects are refused rather than pickled"""
+        with self.assertRaises(TypeError):
+            dumps([result_cache.QueryCache])
+        with self.assertRaises(ValueError):
+            loads(b"\x02" + pickle.dumps([1]))
+
+
+class TestTieredCache(unittest.TestCase):
+    """Two "workers", each with its own L1 and store connection"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.tmp.name, "users.db")
+        conn = sqlite3.connect(self.database)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT)")
+        conn.execute("INSERT INTO users (email) VALUES ('a@example.com')")
+        conn.commit()
+        conn.close()
+        path = os.path.join(self.tmp.name, "cache.db")
+        self.stores = [SharedStore(path), SharedStore(path)]
+        self.caches = [TieredCache(store, sync_interval=0)
+                       for store in self.stores]
+        self.executions = 0
+
+    def tearDown(self):
+        for store in self.stores:
+            store.close()
+        self.tmp.cleanup()
+
+    def fetcher(self, cache):
+        @with_db_connection(database=self.database)
+        @cache_query(cache=cache)
+        def fetch(conn, query, params=()):
+            self.executions += 1
+            return conn.execute(query, params).fetchall()
+        return fetch
+
+    def test_result_shared_between_workers(self):
+        """A result computed by one worker is an L2 hit for the other"""
+        first, second = (self.fetcher(cache) for cache in self.caches)
+        self.assertEqual(first(QUERY, (1,)), [("a@example.com",)])
+        self.assertEqual(second(QUERY, (1,)), [("a@example.com",)])
+        self.assertEqual(second(QUERY, (1,)), [("a@example.com",)])
+        self.assertEqual(self.executions, 1)
+        stats = self.caches[1].stats()
+        self.assertEqual((stats["hits"], stats["l2_hits"]), (2, 1))
+
+    def test_invalidation_reaches_other_workers(self):
+        """Invalidating a table drops it from L2 and from other L1s"""
+        first, second = (self.fetcher(cache) for cache in self.caches)
+        first(QUERY, (1,))
+        second(QUERY, (1,))
+        self.caches[0].invalidate_tables(frozenset({"users"}))
+        second(QUERY, (1,))
+        self.assertEqual(self.executions, 2)
+
+    def test_stale_result_skips_both_tiers(self):
+        """A result whose table was invalidated mid-load is not shared"""
+        generations = self.caches[0].generations({"users"})
+        self.caches[0].invalidate_tables(frozenset({"users"}))
+        self.assertFalse(self.caches[0].set(
+            "key", [1], tables={"users"}, generations=generations))
+        self.assertEqual(self.caches[0].get("key"), (False, None))
+        self.assertEqual(self.caches[1].get("key"), (False, None))
+
+    def test_ttl_is_shared(self):
+        """An entry expires in L2 and in the L1 copies made from it"""
+        cache = TieredCache(self.stores[0], ttl=0.05)
+        cache.set("key", [1], tables={"users"})
+        self.assertEqual(self.caches[1].get("key"), (True, [1]))
+        time.sleep(0.06)
+        self.assertEqual(self.caches[1].get("key"), (False, None))
+        self.assertEqual(cache.get("key"), (False, None))
+
+    def test_unstorable_results_stay_in_l1(self):
+        """A result dumps() refuses is cached locally but not shared"""
+        row = sqlite3.Row
+        self.caches[0].set("key", [row])
+        self.assertEqual(self.caches[0].get("key"), (True, [row]))
+        self.assertEqual(self.caches[1].get("key"), (False, None))
+        self.assertEqual(self.stores[0].skipped, 1)
+
+    def test_store_file_is_private(self):
+        """A new store file is readable and writable by its owner only"""
+        mode = stat.S_IMODE(os.stat(self.stores[0].path).st_mode)
+        self.assertEqual(mode, 0o600)
+
+    def test_store_errors_are_misses(self):
+        """A locked store degrades to a miss rather than an error"""
+        store = SharedStore(self.stores[0].path, busy_timeout=0.01)
+        blocker = sqlite3.connect(store.path, isolation_level=None)
+        blocker.execute("BEGIN EXCLUSIVE")
+        try:
+            store.set("key", [1])
+            self.assertEqual(store.get("key")[0], False)
+        finally:
+            blocker.execute("ROLLBACK")
+            blocker.close()
+            store.close()
+        self.assertGreaterEqual(store.errors, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
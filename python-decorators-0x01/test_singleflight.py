@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""Stress tests for single-flight cache_query misses"""
+
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+from result_cache import QueryCache
+from singleflight import AsyncSingleFlight, SingleFlight
+
+cache_query = __import__('4-cache_query').cache_query
+with_db_connection = __import__('1-with_db_connection').with_db_connection
+
+CALLERS = 32
+QUERY = "SELECT email FROM users WHERE id = ?"
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """Throwaway users database plus a log of executed queries"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.tmp.name, "users.db")
+        conn = sqlite3.connect(self.database)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT)")
+        conn.executemany("INSERT INTO users (email) VALUES (?)",
+                         [("a@example.com",), ("b@example.com",)])
+        conn.commit()
+        conn.close()
+        self.executions = []
+        self.lock = threading.Lock()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def record(self, query, params):
+        with self.lock:
+            self.executions.append((query, params))
+
+
+class TestSingleFlight(DatabaseTestCase):
+    """Concurrent threads missing on the same key"""
+
+    def run_callers(self, fetch, params):
+        barrier = threading.Barrier(CALLERS)
+        results = []
+
+        def call():
+            barrier.wait()
+            results.append(fetch(QUERY, params))
+
+        threads = [threading.Thread(target=call) for _ in range(CALLERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_one_execution_per_key_per_miss_window(self):
+        """Each miss window runs the query once per key"""
+        cache = QueryCache(ttl=0.2)
+
+        @with_db_connection(database=self.database)
+        @cache_query(cache=cache)
+        def fetch(conn, query, params=()):
+            self.record(query, params)
+            time.sleep(0.05)  # keep the flight open while callers pile up
+            return conn.execute(query, params).fetchall()
+
+        for window in range(2):
+            for params in ((1,), (2,)):
+                results = self.run_callers(fetch, params)
+                self.assertEqual(len(results), CALLERS)
+                self.assertEqual(len({tuple(r) for r in results}), 1)
+            self.assertEqual(self.executions.count((QUERY, (1,))), window + 1)
+            self.assertEqual(self.executions.count((QUERY, (2,))), window + 1)
+            time.sleep(0.25)  # let the entries expire
+
+    def test_errors_reach_every_waiter(self):
+        """Callers sharing a failed flight all see the error"""
+        flights = SingleFlight()
+        started = threading.Event()
+        errors = []
+
+        def fail():
+            started.set()
+            time.sleep(0.05)
+            raise sqlite3.OperationalError("database is locked")
+
+        def call():
+            try:
+                flights.do("key", fail)
+            except sqlite3.OperationalError as err:
+                errors.append(err)
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait()
+        followers = [threading.Thread(target=call) for _ in range(4)]
+        for thread in followers:
+            thread.start()
+        for thread in [leader] + followers:
+            thread.join()
+        self.assertEqual(len(errors), 5)
+        self.assertEqual(flights.shared, 4)
+
+
+class TestAsyncSingleFlight(DatabaseTestCase):
+    """Concurrent tasks missing on the same key"""
+
+    def test_one_execution_per_key(self):
+        """Tasks on one loop share a single query per key"""
+        cache = QueryCache()
+
+        @with_db_connection(database=self.database)
+        @cache_query(cache=cache)
+        async def fetch(conn, query, params=()):
+            self.record(query, params)
+            await asyncio.sleep(0.05)
+            return await asyncio.to_thread(
+                lambda: conn.execute(query, params).fetchall())
+
+        async def main():
+            return await asyncio.gather(
+                *(fetch(QUERY, (i % 2 + 1,)) for i in range(CALLERS)))
+
+        results = asyncio.run(main())
+        self.assertEqual(len(self.executions), 2)
+        self.assertEqual(results[0], [("a@example.com",)])
+        self.assertEqual(results[1], [("b@example.com",)])
+        self.assertEqual(fetch.flights.shared, CALLERS - 2)
+
+    def test_cancelled_waiter_does_not_cancel_leader(self):
+        """Cancelling one waiter leaves the shared flight running"""
+        flights = AsyncSingleFlight()
+
+        async def slow():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        async def main():
+            leader = asyncio.ensure_future(flights.do("key", slow))
+            await asyncio.sleep(0)
+            waiter = asyncio.ensure_future(flights.do("key", slow))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            return await leader
+
+        self.assertEqual(asyncio.run(main()), "done")
+
+    def test_cancelled_leader_does_not_cancel_waiters(self):
+        """Waiters still get the result when the first caller is cancelled"""
+        flights = AsyncSingleFlight()
+
+        async def slow():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        async def main():
+            leader = asyncio.ensure_future(flights.do("key", slow))
+            await asyncio.sleep(0)
+            waiter = asyncio.ensure_future(flights.do("key", slow))
+            await asyncio.sleep(0)
+            leader.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await leader
+            return await waiter
+
+        self.assertEqual(asyncio.run(main()), "done")
+
+    def test_cancelled_leader_keeps_its_connection_for_waiters(self):
+        """The shared query finishes on the cancelled caller's connection"""
+        cache = QueryCache()
+
+        @with_db_connection(database=self.database)
+        @cache_query(cache=cache)
+        async def fetch(conn, query, params=()):
+            await asyncio.sleep(0.05)
+            return conn.execute(query, params).fetchall()
+
+        async def main():
+            leader = asyncio.ensure_future(fetch(QUERY, (1,)))
+            await asyncio.sleep(0.01)
+            waiter = asyncio.ensure_future(fetch(QUERY, (1,)))
+            await asyncio.sleep(0)
+            leader.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await leader
+            return await waiter
+
+        self.assertEqual(asyncio.run(main()), [("a@example.com",)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,20 +1,35 @@
-import mysql.connector
+import seed
+from changes import ChangeStream
 
-def get_db_connection():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="",
-        database="ALX_prodev"
-    )
-def stream_users():
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM user_data")
-    
-    while True:
-        row = cursor.fetchone()
-        if not row:
+def stream_users(fetch_size=1000, as_tuples=False):
+    """Stream rows from user_data one by one over an unbuffered cursor.
+
+    Rows are pulled from the server fetch_size at a time, so client memory
+    stays bounded by a single chunk whatever the table size. Pass
+    as_tuples=True to get plain tuples instead of building a dict per row.
+    """
+    # Leaving the with block, on exhaustion or when the consumer drops the
+    # generator early, hands the connection back to the pool
+    with seed.pooled_connection() as conn:
+        cursor = conn.cursor(buffered=False, dictionary=not as_tuples)
+        try:
+            cursor.execute("SELECT * FROM user_data")
+            while True:
+                rows = cursor.fetchmany(fetch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
             cursor.close()
-            conn.close()
-            break yield row
+
+def stream_user_changes(checkpoint=None, follow=False, batch_size=1000,
+                        poll_interval=5.0):
+    """Stream only rows added or changed since the checkpointed watermark.
+
+    Work is proportional to the delta rather than the table. With
+    follow=True the stream keeps polling for new changes (see changes.py).
+    """
+    changes = ChangeStream(checkpoint, batch_size)
+    batches = changes.tail(poll_interval) if follow else changes.batches()
+    for batch in batches:
+        yield from batch
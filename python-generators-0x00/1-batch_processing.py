@@ -1,26 +1,79 @@
-import mysql.connector
+import time
+import seed
+from checkpoint import checkpointed
+from columnar import batch_converter
+from pipeline import Pipeline, col, quote_identifier
 
-def get_db_connection():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="",
-        database="ALX_prodev"
-    )
-def stream_users_in_batches(batch_size):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM user_data")
-    
-    while True:
-        batch = cursor.fetchmany(batch_size)
-        if not batch:
+def stream_users_in_batches(batch_size, columns=None, where=None, params=(),
+                            columnar=None, dtypes=None, ordered=False,
+                            adaptive=None):
+    """Yield lists of user_data rows, batch_size at a time.
+
+    `columns` narrows the SELECT list and `where` (with %s placeholders
+    bound from `params`) filters rows on the server. ordered=True returns
+    rows in user_id order.
+
+    With columnar="structured" each batch is a NumPy structured array, and
+    with columnar="columns" a dict of per-column arrays, so filters and
+    aggregates can run vectorized (see columnar.batch_converter).
+
+    Pass an adaptive.AdaptiveBatchSizer as `adaptive` to let it resize
+    each fetch from observed latency and row width; batch_size is then only
+    the starting size.
+    """
+    select_list = ", ".join(map(quote_identifier, columns)) if columns else "*"
+    query = f"SELECT {select_list} FROM user_data"
+    if where:
+        query += f" WHERE {where}"
+    if ordered:
+        query += " ORDER BY user_id"
+    with seed.pooled_connection() as conn:
+        cursor = conn.cursor(dictionary=columnar is None)
+        try:
+            cursor.execute(query, params)
+            convert = None
+            if columnar is not None:
+                convert = batch_converter(
+                    cursor.column_names, columnar, dtypes)
+            size = adaptive.start(batch_size) if adaptive else batch_size
+            while True:
+                started = time.perf_counter()
+                batch = cursor.fetchmany(size)
+                if not batch:
+                    break
+                if adaptive:
+                    size = adaptive.observe(batch, time.perf_counter() - started)
+                yield convert(batch) if convert else batch
+        finally:
             cursor.close()
-            conn.close()
-            break
-        yield batch
-def batch_processing(batch_size):
-    for batch in stream_users_in_batches(batch_size):
-        for user in batch:
-            if user['age'] > 25:
-                print(user)
+
+def batch_processing(batch_size, checkpoint=None, sink=None):
+    """Print users over 25, or write them to a sink from sinks.py.
+
+    With a checkpoint (see checkpoint.py) the run resumes after the last
+    batch a previous, interrupted run finished. A sink then gets each
+    batch flushed before the checkpoint moves past it; open path sinks
+    with append=True so a resumed run keeps the earlier output.
+    """
+    # The age filter runs in MySQL, so only matching rows are fetched
+    if checkpoint is None:
+        # Fetch the next batch while the current one is printed
+        source, prefetch = stream_users_in_batches, 2
+    else:
+        source, prefetch = checkpointed(stream_users_in_batches, checkpoint), 0
+    adults = Pipeline(source).filter(col('age') > 25)
+    if sink is not None and checkpoint is not None:
+        # Whole source batches, not re-chunked rows: checkpointed saves a
+        # batch when the next one is requested, so it must be on disk by then
+        columns, where, params, _ = adults.compile()
+        for batch in source(batch_size, columns=columns, where=where,
+                            params=params):
+            sink.write_batch(batch)
+            sink.flush()
+        return
+    if sink is not None:
+        for batch in adults.batch(batch_size).run(batch_size, prefetch):
+            sink.write_batch(batch)
+        return
+    for user in adults.run(batch_size, prefetch=prefetch):
+        print(user)
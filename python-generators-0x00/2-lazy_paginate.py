@@ -1,18 +1,61 @@
+import base64
+import json
 import seed
 
 def paginate_users(page_size, offset):
-    connection = seed.connect_to_prodev()
+    """Fetch one page with LIMIT/OFFSET (kept for comparison benchmarks)"""
+    with seed.pooled_connection() as connection:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(f"SELECT * FROM user_data LIMIT {page_size} OFFSET {offset}")
+        rows = cursor.fetchall()
+        cursor.close()
+    return rows
+
+def paginate_users_after(connection, page_size, after=None):
+    """Fetch the page of users whose user_id sorts right after `after`.
+
+    Seeks on the primary key instead of skipping `offset` rows, so every
+    page costs the same no matter how deep into the table it is.
+    """
     cursor = connection.cursor(dictionary=True)
-    cursor.execute(f"SELECT * FROM user_data LIMIT {page_size} OFFSET {offset}")
+    if after is None:
+        cursor.execute(
+            "SELECT * FROM user_data ORDER BY user_id LIMIT %s", (page_size,))
+    else:
+        cursor.execute(
+            "SELECT * FROM user_data WHERE user_id > %s "
+            "ORDER BY user_id LIMIT %s", (after, page_size))
     rows = cursor.fetchall()
-    connection.close()
+    cursor.close()
     return rows
 
-def lazy_paginate(page_size):
-    offset = 0
-    while True:
-        page = paginate_users(page_size, offset)
-        if not page:
-            break
+def encode_resume_token(user_id):
+    """Wrap the last seen user_id in an opaque, URL-safe token"""
+    payload = json.dumps({"after": user_id}).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+def decode_resume_token(token):
+    """Return the user_id stored in a token from encode_resume_token"""
+    try:
+        return json.loads(base64.urlsafe_b64decode(token.encode()))["after"]
+    except (ValueError, KeyError, TypeError) as err:
+        raise ValueError(f"Invalid resume token: {token!r}") from err
+
+def keyset_paginate(page_size, resume_token=None):
+    """Yield (page, token) pairs; pass a token back in to resume after it.
+
+    One pooled connection serves every page of the walk.
+    """
+    after = decode_resume_token(resume_token) if resume_token else None
+    with seed.pooled_connection() as connection:
+        while True:
+            page = paginate_users_after(connection, page_size, after)
+            if not page:
+                break
+            after = page[-1]['user_id']
+            yield page, encode_resume_token(after)
+
+def lazy_paginate(page_size, resume_token=None):
+    """Yield pages of users in user_id order, fetching each one on demand"""
+    for page, _ in keyset_paginate(page_size, resume_token):
         yield page
-        offset += page_size
@@ -1,29 +1,41 @@
 import seed
+import stats
+from snapshot import Snapshot
 
 def stream_user_ages():
-    connection = seed.connect_to_prodev()
-    cursor = connection.cursor()
-    cursor.execute("SELECT age FROM user_data")
-    
-    while True:
-        row = cursor.fetchone()
-        if not row:
+    with seed.pooled_connection() as connection:
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT age FROM user_data")
+            while True:
+                row = cursor.fetchone()
+                if not row:
+                    break
+                yield row[0]
+        finally:
             cursor.close()
-            connection.close()
-            break
-        yield row[0]
 
-def calculate_average_age():
-    total = 0
-    count = 0
-    
-    for age in stream_user_ages():
-        total += age
-        count += 1
-    
-    if count > 0:
-        average = total / count
-        print(f"Average age of users: {average:.2f}")
+def age_summary(pushdown=True, snapshot=None):
+    """Age statistics for user_data.
+
+    Given a snapshot file (see snapshot.py) the ages are read from it and
+    the database is not touched. With pushdown the database computes
+    COUNT/AVG/MIN/MAX and nothing is streamed. Otherwise the ages are
+    streamed once into a RunningStats, which also yields variance and
+    p50/p95/p99.
+    """
+    if snapshot is not None:
+        with Snapshot(snapshot) as users:
+            return users.age_summary()
+    if pushdown:
+        with seed.pooled_connection() as connection:
+            return stats.sql_summary(connection, "age")
+    return stats.RunningStats().update(stream_user_ages()).summary()
+
+def calculate_average_age(pushdown=True, snapshot=None):
+    summary = age_summary(pushdown, snapshot)
+    if summary["count"]:
+        print(f"Average age of users: {summary['avg']:.2f}")
     else:
         print("No users found")
 
@@ -0,0 +1,83 @@
+SAMPLE_ROWS = 16
+
+def estimate_row_bytes(rows, sample=SAMPLE_ROWS):
+    """Approximate payload bytes per row from a few rows of a batch.
+
+    Strings and bytes count their length, anything else 8 bytes. Works for
+    dict and tuple rows.
+    """
+    sampled = rows[:sample]
+    if not sampled:
+        return 0
+    total = 0
+    for row in sampled:
+        values = row.values() if isinstance(row, dict) else row
+        for value in values:
+            total += len(value) if isinstance(value, (str, bytes)) else 8
+    return total / len(sampled)
+
+class AdaptiveBatchSizer:
+    """Pick fetchmany() sizes from observed fetch latency and row width.
+
+    After each fetch the size doubles while fetches finish well under
+    `target_latency` seconds and halves when they take longer, always
+    capped so one batch stays within `memory_budget` bytes of row data.
+    Row width is an exponential moving average, so wide rows shrink the
+    cap quickly. `on_batch`, if given, receives a dict per fetch with the
+    size used, rows returned, fetch time, bytes per row and the next size;
+    the same dicts are kept in `history` when keep_history=True.
+    """
+
+    def __init__(self, initial_size=None, min_size=100, max_size=100_000,
+                 memory_budget=16 << 20, target_latency=0.05, on_batch=None,
+                 keep_history=False):
+        self.size = initial_size
+        self.min_size = min_size
+        self.max_size = max_size
+        self.memory_budget = memory_budget
+        self.target_latency = target_latency
+        self.on_batch = on_batch
+        self.history = [] if keep_history else None
+        self.bytes_per_row = None
+
+    def start(self, batch_size):
+        """Seed the size from the caller's batch_size unless already tuned"""
+        if self.size is None:
+            self.size = self._clamp(batch_size)
+        return self.size
+
+    def _clamp(self, size):
+        cap = self.max_size
+        if self.bytes_per_row:
+            cap = min(cap, int(self.memory_budget // self.bytes_per_row))
+        return max(self.min_size, min(cap, int(size)))
+
+    def observe(self, rows, fetch_seconds):
+        """Record one fetch and return the size for the next one"""
+        used = self.size
+        if rows:
+            width = estimate_row_bytes(rows)
+            if self.bytes_per_row is None:
+                self.bytes_per_row = width
+            else:
+                self.bytes_per_row = 0.7 * self.bytes_per_row + 0.3 * width
+        # Only a full batch says anything about whether a bigger one fits
+        if len(rows) == used and fetch_seconds < self.target_latency / 2:
+            proposed = used * 2
+        elif fetch_seconds > self.target_latency:
+            proposed = used / 2
+        else:
+            proposed = used
+        self.size = self._clamp(proposed)
+        stats = {
+            "batch_size": used,
+            "rows": len(rows),
+            "fetch_seconds": fetch_seconds,
+            "bytes_per_row": self.bytes_per_row,
+            "next_size": self.size,
+        }
+        if self.history is not None:
+            self.history.append(stats)
+        if self.on_batch is not None:
+            self.on_batch(stats)
+        return self.size
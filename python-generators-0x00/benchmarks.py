@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""Benchmarks for the generator entry points.
+
+These reseed user_data in the ALX_prodev database with synthetic rows, so
+only run them against a scratch MySQL server:
+
+    python3 benchmarks.py pagination bulk_load columnar schema
+"""
+import csv
+import os
+import sys
+import tempfile
+import time
+import uuid
+import migrations
+import seed
+from sinks import NDJSONSink
+
+lazy_paginate_module = __import__('2-lazy_paginate')
+batch_processing_module = __import__('1-batch_processing')
+stream_users_module = __import__('0-stream_users')
+stream_ages_module = __import__('4-stream_ages')
+
+# user_data as seed.create_table made it before the schema migrations
+LEGACY_USER_DATA_DDL = """
+    CREATE TABLE user_data (
+        user_id VARCHAR(36) PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        email VARCHAR(255) NOT NULL,
+        age DECIMAL(10,0) NOT NULL,
+        INDEX (user_id)
+    )
+"""
+
+
+def synthetic_users(total_rows):
+    """Yield total_rows (user_id, name, email, age) tuples"""
+    for i in range(total_rows):
+        yield (str(uuid.uuid4()), f"User {i}", f"user{i}@example.com", i % 100)
+
+
+def truncate_users(connection):
+    """Empty user_data"""
+    cursor = connection.cursor()
+    cursor.execute("TRUNCATE TABLE user_data")
+    cursor.close()
+
+
+def reseed_synthetic_users(total_rows, chunk_size=10_000):
+    """Replace the contents of user_data with total_rows synthetic users"""
+    connection = seed.connect_to_prodev()
+    truncate_users(connection)
+    seed.insert_rows(connection, synthetic_users(total_rows), chunk_size)
+    connection.close()
+
+
+def time_walk(pages):
+    """Drain a page iterator and return (elapsed seconds, rows seen)"""
+    start = time.perf_counter()
+    rows = sum(len(page) for page in pages)
+    return time.perf_counter() - start, rows
+
+
+def offset_pages(page_size):
+    """The original LIMIT/OFFSET walk over user_data"""
+    offset = 0
+    while True:
+        page = lazy_paginate_module.paginate_users(page_size, offset)
+        if not page:
+            break
+        yield page
+        offset += page_size
+
+
+def bench_pagination(sizes=(10_000, 100_000, 1_000_000), page_size=1000):
+    """Compare a full OFFSET walk with a full keyset walk per table size"""
+    for total_rows in sizes:
+        reseed_synthetic_users(total_rows)
+        offset_time, _ = time_walk(offset_pages(page_size))
+        keyset_time, rows = time_walk(
+            lazy_paginate_module.lazy_paginate(page_size))
+        print(f"{total_rows:>9} rows  offset {offset_time:8.2f}s  "
+              f"keyset {keyset_time:8.2f}s  ({rows} rows walked)")
+
+
+def bench_bulk_load(total_rows=1_000_000, chunk_size=10_000):
+    """Load a synthetic CSV with batched inserts, then with LOAD DATA"""
+    with tempfile.NamedTemporaryFile(
+            "w", suffix=".csv", newline="", delete=False) as file:
+        writer = csv.writer(file, lineterminator="\n")
+        writer.writerow(seed.USER_COLUMNS)
+        writer.writerows(synthetic_users(total_rows))
+    try:
+        connection = seed.connect_to_prodev(allow_local_infile=True)
+        for use_load_data in (False, True):
+            truncate_users(connection)
+            print(f"use_load_data={use_load_data}: ", end="")
+            seed.insert_data(connection, file.name, chunk_size,
+                             use_load_data=use_load_data)
+        connection.close()
+    finally:
+        os.unlink(file.name)
+
+
+def bench_columnar(total_rows=3_000_000, batch_size=10_000):
+    """Mean age of users over 25: dict batches vs NumPy column batches"""
+    reseed_synthetic_users(total_rows)
+    stream = batch_processing_module.stream_users_in_batches
+
+    start = time.perf_counter()
+    total = count = 0
+    for batch in stream(batch_size):
+        for user in batch:
+            if user['age'] > 25:
+                total += user['age']
+                count += 1
+    dict_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    col_total = col_count = 0
+    for batch in stream(batch_size, columnar="columns"):
+        ages = batch['age']
+        adults = ages[ages > 25]
+        col_total += int(adults.sum())
+        col_count += adults.size
+    columnar_time = time.perf_counter() - start
+
+    assert (total, count) == (col_total, col_count)
+    print(f"{total_rows} rows  dicts {dict_time:.2f}s  "
+          f"columnar {columnar_time:.2f}s  mean age {total / count:.2f}")
+
+
+def time_entry_points(batch_size=1000):
+    """Time each streaming entry point once over the current table"""
+    def drain(iterable):
+        for _ in iterable:
+            pass
+
+    def export_adults():
+        with open(os.devnull, "wb") as devnull, NDJSONSink(devnull) as sink:
+            batch_processing_module.batch_processing(batch_size, sink=sink)
+
+    entry_points = {
+        "stream_users": lambda: drain(stream_users_module.stream_users()),
+        "batch_processing": export_adults,
+        "lazy_paginate": lambda: drain(
+            lazy_paginate_module.lazy_paginate(batch_size)),
+        "stream_user_ages": lambda: drain(
+            stream_ages_module.stream_user_ages()),
+        "age_summary(pushdown)": lambda: stream_ages_module.age_summary(True),
+    }
+    timings = {}
+    for name, run in entry_points.items():
+        start = time.perf_counter()
+        run()
+        timings[name] = time.perf_counter() - start
+    return timings
+
+
+def bench_schema(total_rows=1_000_000):
+    """Entry point timings on the legacy schema, then after migrating"""
+    connection = seed.connect_to_prodev()
+    cursor = connection.cursor()
+    cursor.execute("DROP TABLE IF EXISTS user_data")
+    cursor.execute("DROP TABLE IF EXISTS schema_migrations")
+    cursor.execute(LEGACY_USER_DATA_DDL)
+    cursor.close()
+    reseed_synthetic_users(total_rows)
+    before = time_entry_points()
+    migrations.migrate(connection)
+    connection.close()
+    after = time_entry_points()
+    for name in before:
+        print(f"{name:<24} before {before[name]:8.2f}s  "
+              f"after {after[name]:8.2f}s")
+
+
+BENCHMARKS = {
+    "pagination": bench_pagination,
+    "bulk_load": bench_bulk_load,
+    "columnar": bench_columnar,
+    "schema": bench_schema,
+}
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        print(f"== {name}")
+        BENCHMARKS[name]()
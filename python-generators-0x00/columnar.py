@@ -0,0 +1,39 @@
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for columnar batches
+    np = None
+
+LAYOUTS = ("structured", "columns")
+
+# user_data column types; age is a whole number of years
+USER_DTYPES = {
+    "user_id": "U36",
+    "name": object,
+    "email": object,
+    "age": "i4",
+}
+
+def batch_converter(column_names, layout="columns", dtypes=None):
+    """Return a function turning a list of row tuples into NumPy arrays.
+
+    layout="structured" gives one structured array per batch; "columns"
+    gives a dict of per-column arrays (zero-copy views of that array).
+    Unknown columns default to object dtype; `dtypes` overrides any column.
+    """
+    if np is None:
+        raise ImportError("Columnar batches require numpy: pip install numpy")
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown columnar layout {layout!r}, "
+                         f"expected one of {LAYOUTS}")
+    overrides = dtypes or {}
+    dtype = np.dtype([
+        (name, overrides.get(name, USER_DTYPES.get(name, object)))
+        for name in column_names
+    ])
+
+    def convert(rows):
+        array = np.array(rows, dtype=dtype)
+        if layout == "structured":
+            return array
+        return {name: array[name] for name in column_names}
+    return convert
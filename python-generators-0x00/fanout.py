@@ -0,0 +1,84 @@
+import queue
+import threading
+
+_DONE = object()
+
+class _Consumer(threading.Thread):
+    """Runs one consumer over the batches put into its bounded queue"""
+
+    def __init__(self, name, func, buffer_size):
+        super().__init__(name=f"fanout-{name}", daemon=True)
+        self.func = func
+        self.buffer = queue.Queue(maxsize=buffer_size)
+        self.result = None
+        self.error = None
+        self.failed = threading.Event()
+        self.exhausted = False
+
+    def rows(self):
+        while not self.exhausted:
+            batch = self.buffer.get()
+            if batch is _DONE:
+                self.exhausted = True
+                return
+            yield from batch
+
+    def run(self):
+        try:
+            self.result = self.func(self.rows())
+            # Drain whatever the consumer did not read, so the feed never blocks
+            for _ in self.rows():
+                pass
+        except BaseException as err:
+            self.error = err
+            self.failed.set()
+
+    def put(self, batch):
+        """Block until the batch is queued; False if the consumer died"""
+        while not self.failed.is_set():
+            try:
+                self.buffer.put(batch, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+def fan_out(batches, consumers, buffer_size=4):
+    """Feed one pass over `batches` to several consumers at once.
+
+    `consumers` maps a name to a callable taking an iterator of rows and
+    returning a result; each runs on its own thread behind a queue of at
+    most `buffer_size` batches. The scan only moves as fast as the slowest
+    consumer, so memory stays bounded while N analyses cost one pass.
+    Returns {name: result}. If a consumer raises, the scan stops and the
+    error is re-raised.
+
+    Example
+    -------
+        results = fan_out(stream_users_in_batches(1000), {
+            "adults": lambda rows: sum(1 for r in rows if r['age'] > 25),
+            "ages": lambda rows: RunningStats().update(r['age'] for r in rows),
+        })
+    """
+    workers = {name: _Consumer(name, func, buffer_size)
+               for name, func in consumers.items()}
+    for worker in workers.values():
+        worker.start()
+    source = iter(batches)
+    try:
+        for batch in source:
+            for worker in workers.values():
+                if not worker.put(batch):
+                    raise worker.error
+    finally:
+        close = getattr(source, "close", None)
+        if close is not None:
+            close()
+        for worker in workers.values():
+            worker.put(_DONE)
+        for worker in workers.values():
+            worker.join()
+    for worker in workers.values():
+        if worker.error is not None:
+            raise worker.error
+    return {name: worker.result for name, worker in workers.items()}
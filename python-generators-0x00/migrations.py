@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Versioned schema migrations for the ALX_prodev database.
+
+Applied versions are recorded in schema_migrations. Every step checks the
+live schema first, so a table created by the current seed.create_table
+and an old one both end up at the latest version:
+
+    python3 migrations.py status
+    python3 migrations.py migrate [target_version]
+"""
+import sys
+import seed
+
+def _column_type(cursor, table, column):
+    cursor.execute(
+        "SELECT COLUMN_TYPE FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s "
+        "AND COLUMN_NAME = %s", (table, column))
+    row = cursor.fetchone()
+    if row is None:
+        raise RuntimeError(f"{table}.{column} does not exist, "
+                           "run seed.create_table first")
+    return row[0].decode() if isinstance(row[0], bytes) else row[0]
+
+def _has_column(cursor, table, column):
+    cursor.execute(
+        "SELECT 1 FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s "
+        "AND COLUMN_NAME = %s", (table, column))
+    return cursor.fetchone() is not None
+
+def _has_index(cursor, table, index):
+    cursor.execute(
+        "SELECT 1 FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s "
+        "AND INDEX_NAME = %s LIMIT 1", (table, index))
+    return cursor.fetchone() is not None
+
+def compact_age(cursor):
+    """Store age as TINYINT UNSIGNED (1 byte) instead of DECIMAL(10,0)"""
+    column_type = _column_type(cursor, "user_data", "age")
+    # MySQL before 8.0.19 reports a display width: tinyint(3) unsigned
+    if not (column_type.startswith("tinyint") and "unsigned" in column_type):
+        cursor.execute(
+            "ALTER TABLE user_data MODIFY age TINYINT UNSIGNED NOT NULL")
+
+def drop_duplicate_user_id_index(cursor):
+    """Drop INDEX (user_id), which duplicates the primary key"""
+    if _has_index(cursor, "user_data", "user_id"):
+        cursor.execute("ALTER TABLE user_data DROP INDEX user_id")
+
+def add_age_covering_index(cursor):
+    """Index age with name and email so age scans never touch the table.
+
+    InnoDB secondary indexes carry the primary key, so (age, name, email)
+    covers user_id, name, email and age: `age > 25` filters, SELECT age and
+    AVG/MIN/MAX(age) all run as index range or index-only scans.
+    """
+    if not _has_index(cursor, "user_data", "idx_user_data_age"):
+        cursor.execute(
+            "CREATE INDEX idx_user_data_age ON user_data (age, name, email)")
+
+def add_updated_at(cursor):
+    """Track when each row last changed, for incremental change streams.
+
+    Existing rows are stamped with the migration time. The index on
+    (updated_at, user_id) backs the keyset scans in changes.py.
+    """
+    if not _has_column(cursor, "user_data", "updated_at"):
+        cursor.execute(
+            "ALTER TABLE user_data ADD COLUMN updated_at TIMESTAMP(6) "
+            "NOT NULL DEFAULT CURRENT_TIMESTAMP(6) "
+            "ON UPDATE CURRENT_TIMESTAMP(6), "
+            "ADD INDEX idx_user_data_updated_at (updated_at, user_id)")
+
+def widen_checkpoint_key(cursor):
+    """Widen stream_checkpoints.last_key to fit change-stream watermarks.
+
+    A change stream saves "updated_at|user_id" (63 characters), which the
+    original VARCHAR(36) could not hold. Skipped until TableCheckpoint has
+    created the table.
+    """
+    if _has_column(cursor, "stream_checkpoints", "last_key") and \
+            _column_type(cursor, "stream_checkpoints", "last_key") \
+            != "varchar(96)":
+        cursor.execute("ALTER TABLE stream_checkpoints "
+                       "MODIFY last_key VARCHAR(96) NOT NULL")
+
+MIGRATIONS = [
+    (1, "compact_age", compact_age),
+    (2, "drop_duplicate_user_id_index", drop_duplicate_user_id_index),
+    (3, "add_age_covering_index", add_age_covering_index),
+    (4, "add_updated_at", add_updated_at),
+    (5, "widen_checkpoint_key", widen_checkpoint_key),
+]
+
+def _ensure_version_table(cursor):
+    cursor.execute(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INT PRIMARY KEY, "
+        "name VARCHAR(255) NOT NULL, "
+        "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+
+def current_version(connection):
+    """Highest applied migration version, 0 for an unmigrated database"""
+    cursor = connection.cursor()
+    _ensure_version_table(cursor)
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+    version = cursor.fetchone()[0]
+    cursor.close()
+    return version
+
+def migrate(connection, target=None):
+    """Apply pending migrations up to `target` (default: latest) in order.
+
+    MySQL commits DDL implicitly, so each migration is recorded right after
+    it runs; a failed run resumes at the migration that failed.
+    Returns the list of versions applied.
+    """
+    applied = []
+    version = current_version(connection)
+    cursor = connection.cursor()
+    try:
+        for number, name, step in MIGRATIONS:
+            if number <= version or (target is not None and number > target):
+                continue
+            print(f"Applying migration {number}: {name}")
+            step(cursor)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                (number, name))
+            connection.commit()
+            applied.append(number)
+    finally:
+        cursor.close()
+    return applied
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    connection = seed.connect_to_prodev()
+    if command == "migrate":
+        target = int(sys.argv[2]) if len(sys.argv) > 2 else None
+        migrate(connection, target)
+    latest = MIGRATIONS[-1][0]
+    print(f"Schema version {current_version(connection)} (latest {latest})")
+    connection.close()
@@ -0,0 +1,131 @@
+import multiprocessing
+import queue
+import seed
+from pipeline import quote_identifier
+
+def key_ranges(connection, shards):
+    """Split user_data into `shards` user_id ranges of about equal size.
+
+    Returns [(low, high), ...] for `low <= user_id < high`, with None for
+    an open end. Boundaries come from one NTILE pass over the primary key.
+    """
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT MIN(user_id) FROM ("
+        "SELECT user_id, NTILE(%s) OVER (ORDER BY user_id) AS tile "
+        "FROM user_data) AS tiles GROUP BY tile ORDER BY tile", (shards,))
+    starts = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    bounds = [None] + starts[1:] + [None]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def shard_query(low, high, columns=None, where=None, params=()):
+    """Build the (query, params) that scans one user_id range in key order"""
+    select_list = ", ".join(map(quote_identifier, columns)) if columns else "*"
+    clauses = [f"({where})"] if where else []
+    values = list(params)
+    if low is not None:
+        clauses.append("user_id >= %s")
+        values.append(low)
+    if high is not None:
+        clauses.append("user_id < %s")
+        values.append(high)
+    query = f"SELECT {select_list} FROM user_data"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    return query + " ORDER BY user_id", tuple(values)
+
+def _scan_shard(shard, query, params, batch_size, out, connect=None):
+    """Worker process: stream one shard's batches into the out queue"""
+    try:
+        # A fresh connection: pooled sockets must not cross processes
+        connection = (connect or seed.connect_to_prodev)()
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(query, params)
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            out.put((shard, "rows", batch))
+        cursor.close()
+        connection.close()
+    except Exception as err:
+        out.put((shard, "error", f"{type(err).__name__}: {err}"))
+    finally:
+        out.put((shard, "done", None))
+
+def parallel_scan(batch_size, columns=None, where=None, params=(), shards=4,
+                  processes=None, ordered=False, queue_size=8, connect=None):
+    """Scan user_data in parallel key ranges, yielding batches of row dicts.
+
+    Each shard runs in its own process on its own connection, with at most
+    `processes` (default: `shards`) running at once. Batches come back
+    through bounded queues holding `queue_size` batches, so workers block
+    instead of buffering when the consumer falls behind.
+
+    Unordered mode yields batches as soon as any shard produces them.
+    Ordered mode yields shard by shard, so rows arrive in user_id order.
+    The signature matches stream_users_in_batches, so it can back a
+    Pipeline through functools.partial.
+
+    `connect` opens the planning and worker connections instead of the
+    ALX_prodev pool; workers are spawned, so it must be picklable (a
+    module-level function or a functools.partial of one).
+    """
+    if connect is None:
+        with seed.pooled_connection() as connection:
+            ranges = key_ranges(connection, shards)
+    else:
+        connection = connect()
+        try:
+            ranges = key_ranges(connection, shards)
+        finally:
+            connection.close()
+    processes = processes or len(ranges)
+    context = multiprocessing.get_context("spawn")
+    shared = None if ordered else context.Queue(queue_size)
+    queues = [shared if shared is not None else context.Queue(queue_size)
+              for _ in ranges]
+    workers = []
+
+    def start_next():
+        shard = len(workers)
+        if shard < len(ranges):
+            query, values = shard_query(*ranges[shard], columns, where, params)
+            worker = context.Process(
+                target=_scan_shard, daemon=True,
+                args=(shard, query, values, batch_size, queues[shard],
+                      connect))
+            worker.start()
+            workers.append(worker)
+
+    def drain(source, pending, watched):
+        while pending:
+            try:
+                shard, kind, payload = source.get(timeout=1)
+            except queue.Empty:
+                # Guard against a worker killed before it could report
+                if not any(worker.is_alive() for worker in watched):
+                    raise RuntimeError("Scan worker exited without finishing")
+                continue
+            if kind == "rows":
+                yield payload
+            elif kind == "error":
+                raise RuntimeError(f"Shard {shard} failed: {payload}")
+            else:
+                pending -= 1
+                start_next()
+
+    for _ in range(min(processes, len(ranges))):
+        start_next()
+    try:
+        if ordered:
+            for shard in range(len(ranges)):
+                yield from drain(queues[shard], 1, workers[shard:shard + 1])
+        else:
+            yield from drain(shared, len(ranges), workers)
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
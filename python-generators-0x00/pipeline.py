@@ -0,0 +1,181 @@
+import operator
+import re
+from prefetch import prefetch as prefetch_batches
+
+IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+SQL_OPERATORS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+def quote_identifier(name):
+    """Backtick-quote a column name, rejecting anything but plain names"""
+    if not IDENTIFIER.match(name):
+        raise ValueError(f"Invalid column name: {name!r}")
+    return f"`{name}`"
+
+class Condition:
+    """A column comparison that can run as SQL or against a row dict"""
+
+    def __init__(self, column, op, value):
+        quote_identifier(column)
+        self.column = column
+        self.op = op
+        self.value = value
+
+    def to_sql(self):
+        """Return a (clause, params) pair for a WHERE list"""
+        if self.op == "IN":
+            placeholders = ", ".join(["%s"] * len(self.value))
+            return (f"{quote_identifier(self.column)} IN ({placeholders})",
+                    tuple(self.value))
+        return f"{quote_identifier(self.column)} {self.op} %s", (self.value,)
+
+    def __call__(self, row):
+        if self.op == "IN":
+            return row[self.column] in self.value
+        return SQL_OPERATORS[self.op](row[self.column], self.value)
+
+    def __repr__(self):
+        return f"Condition({self.column!r}, {self.op!r}, {self.value!r})"
+
+class Column:
+    """Builds Conditions with comparison operators: col('age') > 25"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __eq__(self, value):
+        return Condition(self.name, "=", value)
+
+    def __ne__(self, value):
+        return Condition(self.name, "!=", value)
+
+    def __lt__(self, value):
+        return Condition(self.name, "<", value)
+
+    def __le__(self, value):
+        return Condition(self.name, "<=", value)
+
+    def __gt__(self, value):
+        return Condition(self.name, ">", value)
+
+    def __ge__(self, value):
+        return Condition(self.name, ">=", value)
+
+    def isin(self, values):
+        return Condition(self.name, "IN", list(values))
+
+    __hash__ = None
+
+def col(name):
+    """Shorthand for Column(name)"""
+    return Column(name)
+
+class Pipeline:
+    """Composable filter/select/map/batch steps over a batched row source.
+
+    `source(batch_size, columns=None, where=None, params=())` must yield
+    lists of row dicts, like stream_users_in_batches. Condition filters and
+    column selection that come before any Python-only step are compiled
+    into the source's WHERE clause and SELECT list; everything else runs
+    in Python on the rows that come back.
+
+    Example
+    -------
+        adults = Pipeline(stream_users_in_batches).filter(col('age') > 25)
+        for user in adults.select('name', 'email').run(500):
+            print(user)
+    """
+
+    def __init__(self, source, steps=(), batch_size=None):
+        self.source = source
+        self.steps = tuple(steps)
+        self.batch_size = batch_size
+
+    def _with(self, step):
+        return Pipeline(self.source, self.steps + (step,), self.batch_size)
+
+    def filter(self, predicate):
+        """Keep rows matching a Condition or any callable(row) -> bool"""
+        return self._with(("filter", predicate))
+
+    def select(self, *columns):
+        """Keep only the named columns"""
+        for column in columns:
+            quote_identifier(column)
+        return self._with(("select", columns))
+
+    def map(self, func):
+        """Transform every row with func(row)"""
+        return self._with(("map", func))
+
+    def batch(self, size):
+        """Yield lists of up to `size` rows instead of single rows"""
+        return Pipeline(self.source, self.steps, size)
+
+    def compile(self):
+        """Split the steps into (columns, where, params, python_steps)"""
+        columns = None
+        clauses = []
+        params = []
+        python_steps = []
+        for kind, arg in self.steps:
+            in_python = bool(python_steps)
+            mapped = any(step == "map" for step, _ in python_steps)
+            if (kind == "filter" and isinstance(arg, Condition)
+                    and not mapped
+                    and (columns is None or arg.column in columns)):
+                clause, values = arg.to_sql()
+                clauses.append(clause)
+                params.extend(values)
+            elif kind == "select" and not in_python:
+                if columns is not None and not set(arg) <= set(columns):
+                    raise ValueError(f"Columns {arg} were already dropped")
+                columns = arg
+            else:
+                python_steps.append((kind, arg))
+        where = " AND ".join(clauses) or None
+        return columns, where, tuple(params), python_steps
+
+    def _rows(self, fetch_size, prefetch):
+        columns, where, params, python_steps = self.compile()
+        batches = self.source(fetch_size, columns=columns, where=where,
+                              params=params)
+        if prefetch:
+            batches = prefetch_batches(batches, prefetch)
+        for batch in batches:
+            for row in batch:
+                for kind, arg in python_steps:
+                    if kind == "filter":
+                        if not arg(row):
+                            break
+                    elif kind == "select":
+                        row = {column: row[column] for column in arg}
+                    else:
+                        row = arg(row)
+                else:
+                    yield row
+
+    def run(self, fetch_size=1000, prefetch=0):
+        """Yield result rows, or row lists when batch() was set.
+
+        prefetch > 0 fetches that many source batches ahead on a background
+        thread (see prefetch.prefetch).
+        """
+        if self.batch_size is None:
+            yield from self._rows(fetch_size, prefetch)
+            return
+        batch = []
+        for row in self._rows(fetch_size, prefetch):
+            batch.append(row)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
@@ -0,0 +1,58 @@
+import queue
+import threading
+
+_DONE = object()
+
+def prefetch(iterable, depth=2):
+    """Iterate `iterable` on a background thread, keeping `depth` items ready.
+
+    Wrapping a batch generator lets the next fetchmany() run while the
+    caller processes the current batch, so a stream takes about
+    max(fetch time, process time) per batch instead of their sum. At most
+    `depth` items are buffered; the fetch thread blocks until the consumer
+    catches up. Exceptions from the source are re-raised in the consumer,
+    and closing the wrapper early closes the source on its own thread.
+    """
+    if depth < 1:
+        raise ValueError("depth must be at least 1")
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        # Re-check `stop` so an abandoned consumer cannot block us forever
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        source = iter(iterable)
+        try:
+            for item in source:
+                if not put((item, None)):
+                    break
+            else:
+                put((_DONE, None))
+        except BaseException as err:
+            put((_DONE, err))
+        finally:
+            close = getattr(source, "close", None)
+            if close is not None:
+                close()
+
+    worker = threading.Thread(target=produce, name="prefetch", daemon=True)
+    worker.start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                break
+            yield item
+    finally:
+        stop.set()
+        worker.join()
@@ -1,14 +1,26 @@
 import mysql.connector
+from mysql.connector import pooling
+from contextlib import contextmanager
 import csv
-import uuid
+import time
+from itertools import islice
+
+PROD_DB_CONFIG = {
+    "host": "localhost",
+    "user": "root",
+    "password": "",
+    "database": "ALX_prodev",
+}
+
+_pool = None
 
 def connect_db():
     """Connect to the MySQL server"""
     try:
         connection = mysql.connector.connect(
-      host="localhost",
-       user="root",  
-           password=""   
+            host="localhost",
+            user="root",  
+            password=""   
         )
         return connection
     except mysql.connector.Error as err:
@@ -18,29 +30,67 @@ def connect_db():
 def create_database(connection):
     """Create ALX_prodev database if it doesn't exist"""
     try:
-     cursor = connection.cursor()
-      cursor.execute("CREATE DATABASE IF NOT EXISTS ALX_prodev")
-      print("Database ALX_prodev created successfully")
-   cursor.close()
+        cursor = connection.cursor()
+        cursor.execute("CREATE DATABASE IF NOT EXISTS ALX_prodev")
+        print("Database ALX_prodev created successfully")
+        cursor.close()
     except mysql.connector.Error as err:
         print(f"Error creating database: {err}")
 
-def connect_to_prodev():
+def connect_to_prodev(allow_local_infile=False):
     """Connect to the ALX_prodev database"""
     try:
         connection = mysql.connector.connect(
-            host="localhost",
-            user="root",  
-            password="",   
-            database="ALX_prodev"
-        )
+            allow_local_infile=allow_local_infile, **PROD_DB_CONFIG)
         return connection
     except mysql.connector.Error as err:
         print(f"Error connecting to ALX_prodev: {err}")
         return None
 
+def get_pool(pool_size=5):
+    """Return the shared ALX_prodev connection pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        _pool = pooling.MySQLConnectionPool(
+            pool_name="prodev_pool",
+            pool_size=pool_size,
+            pool_reset_session=True,
+            consume_results=True,
+            **PROD_DB_CONFIG
+        )
+    return _pool
+
+@contextmanager
+def pooled_connection(timeout=10, poll_interval=0.05):
+    """Borrow a live ALX_prodev connection from the shared pool.
+
+    Waits up to `timeout` seconds when every connection is checked out.
+    The connection goes back to the pool when the block exits, including
+    when a generator holding it is closed before it is exhausted.
+    """
+    pool = get_pool()
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            connection = pool.get_connection()
+            break
+        except mysql.connector.errors.PoolError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(poll_interval)
+    try:
+        # Liveness check: re-open sessions the server dropped while idle
+        connection.ping(reconnect=True, attempts=2, delay=0)
+        yield connection
+    finally:
+        connection.close()
+
 def create_table(connection):
-    """Create user_data table if it doesn't exist"""
+    """Create user_data table if it doesn't exist.
+
+    Matches the latest schema in migrations.py; older tables are upgraded
+    with `python3 migrations.py migrate`.
+    """
     try:
         cursor = connection.cursor()
         cursor.execute("""
@@ -48,8 +98,12 @@ def create_table(connection):
                 user_id VARCHAR(36) PRIMARY KEY,
                 name VARCHAR(255) NOT NULL,
                 email VARCHAR(255) NOT NULL,
-                age DECIMAL(10,0) NOT NULL,
-                INDEX (user_id)
+                age TINYINT UNSIGNED NOT NULL,
+                updated_at TIMESTAMP(6) NOT NULL
+                    DEFAULT CURRENT_TIMESTAMP(6)
+                    ON UPDATE CURRENT_TIMESTAMP(6),
+                INDEX idx_user_data_age (age, name, email),
+                INDEX idx_user_data_updated_at (updated_at, user_id)
             )
         """)
         print("Table user_data created successfully")
@@ -57,26 +111,96 @@ def create_table(connection):
     except mysql.connector.Error as err:
         print(f"Error creating table: {err}")
 
-def insert_data(connection, csv_file):
-    """Insert data from CSV file into user_data table"""
+USER_COLUMNS = ("user_id", "name", "email", "age")
+
+INSERT_SQL = {
+    "ignore": (
+        "INSERT IGNORE INTO user_data (user_id, name, email, age) "
+        "VALUES (%s, %s, %s, %s)"
+    ),
+    "update": (
+        "INSERT INTO user_data (user_id, name, email, age) "
+        "VALUES (%s, %s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE name = VALUES(name), "
+        "email = VALUES(email), age = VALUES(age)"
+    ),
+}
+
+def insert_rows(connection, rows, chunk_size=5000, on_duplicate="ignore"):
+    """Bulk insert (user_id, name, email, age) tuples, committing per chunk.
+
+    Each chunk goes out as one multi-row INSERT through executemany.
+    Existing user_ids are skipped with on_duplicate="ignore" or overwritten
+    with on_duplicate="update". Returns the number of rows sent.
+    """
+    query = INSERT_SQL[on_duplicate]
+    cursor = connection.cursor()
+    total = 0
+    rows = iter(rows)
     try:
-        cursor = connection.cursor()
-        
-        with open(csv_file, mode='r') as file:
-            csv_reader = csv.DictReader(file)
-            
-            for row in csv_reader:
-              
-                cursor.execute("SELECT * FROM user_data WHERE user_id = %s", (row['user_id'],))
-                if cursor.fetchone() is None:
-                    cursor.execute("""
-                        INSERT INTO user_data (user_id, name, email, age)
-                        VALUES (%s, %s, %s, %s)
-                    """, (row['user_id'], row['name'], row['email'], row['age']))
-        
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            cursor.executemany(query, chunk)
+            connection.commit()
+            total += len(chunk)
+    finally:
+        cursor.close()
+    return total
+
+def load_data_infile(connection, csv_file, on_duplicate="ignore"):
+    """Load a CSV with LOAD DATA LOCAL INFILE; returns the rows affected.
+
+    Needs local_infile enabled on the server and a connection opened with
+    allow_local_infile=True.
+    """
+    mode = "REPLACE" if on_duplicate == "update" else "IGNORE"
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            f"LOAD DATA LOCAL INFILE %s {mode} INTO TABLE user_data "
+            "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' "
+            "LINES TERMINATED BY '\\n' IGNORE 1 LINES "
+            "(user_id, name, email, age)", (csv_file,))
         connection.commit()
-        print("Data inserted successfully")
+        return cursor.rowcount
+    finally:
         cursor.close()
+
+def read_csv_rows(csv_file):
+    """Stream (user_id, name, email, age) tuples from the seed CSV"""
+    with open(csv_file, mode='r', newline='') as file:
+        for row in csv.DictReader(file):
+            yield tuple(row[column] for column in USER_COLUMNS)
+
+def insert_data(connection, csv_file, chunk_size=5000, on_duplicate="ignore",
+                use_load_data=False):
+    """Insert data from CSV file into user_data table.
+
+    The CSV is streamed in chunks of chunk_size rows, each written with one
+    batched INSERT and its own commit. With use_load_data=True the server
+    parses the file itself via LOAD DATA LOCAL INFILE, falling back to the
+    batched path when the server or connection does not allow it.
+    """
+    try:
+        start = time.perf_counter()
+        if use_load_data:
+            try:
+                rows = load_data_infile(connection, csv_file, on_duplicate)
+            except mysql.connector.Error as err:
+                print(f"LOAD DATA LOCAL INFILE unavailable ({err}), "
+                      "using batched inserts")
+                connection.rollback()
+                use_load_data = False
+        if not use_load_data:
+            rows = insert_rows(connection, read_csv_rows(csv_file),
+                               chunk_size, on_duplicate)
+        elapsed = time.perf_counter() - start
+        rate = rows / elapsed if elapsed else float("inf")
+        print(f"Data inserted successfully: {rows} rows in {elapsed:.2f}s "
+              f"({rate:,.0f} rows/s)")
+        return rows
     except mysql.connector.Error as err:
         print(f"Error inserting data: {err}")
     except FileNotFoundError:
@@ -0,0 +1,242 @@
+import abc
+import bz2
+import csv
+import gzip
+import io
+import json
+import lzma
+import os
+import struct
+from decimal import Decimal
+
+DEFAULT_BUFFER_SIZE = 1 << 20
+
+COMPRESSORS = {
+    "gzip": lambda raw: gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6),
+    "bz2": lambda raw: bz2.BZ2File(raw, mode="wb"),
+    "lzma": lambda raw: lzma.LZMAFile(raw, mode="wb"),
+}
+
+def _plain(value):
+    """Turn MySQL Decimals into ints/floats; other values pass through"""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
+def _json_default(value):
+    """JSON fallback: Decimals as numbers, anything else as its str()"""
+    return _plain(value) if isinstance(value, Decimal) else str(value)
+
+class _Unclosable(io.RawIOBase):
+    """Adapter letting BufferedWriter wrap any binary stream without owning it.
+
+    With `compression`, data goes through a compressor that is opened on
+    the first write after construction or finish().
+    """
+
+    def __init__(self, stream, compression=None):
+        self._stream = stream
+        self._compression = compression
+        self._compressor = None
+        self._streams = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if self._compression is None:
+            self._stream.write(data)
+        else:
+            if self._compressor is None:
+                self._compressor = COMPRESSORS[self._compression](self._stream)
+                self._streams += 1
+            self._compressor.write(data)
+        return len(data)
+
+    def finish(self, last=False):
+        """End the current compressed stream, if one was started"""
+        if last and self._compression is not None and not self._streams:
+            # Even with no rows, the output must be a valid compressed file
+            self._compressor = COMPRESSORS[self._compression](self._stream)
+            self._streams += 1
+        if self._compressor is not None:
+            self._compressor.close()
+            self._compressor = None
+
+class Sink(abc.ABC):
+    """Base for buffered row sinks writing to a path or binary file object.
+
+    Output goes through a `buffer_size` write buffer and, optionally, a
+    gzip/bz2/lzma compressor, so rows cost a memory copy rather than a
+    syscall each. Use as a context manager, or call close() to flush.
+    File objects passed in are flushed but left open.
+
+    A path target is truncated unless append=True, which continues an
+    existing file (e.g. when resuming from a checkpoint); `resumed` tells
+    whether it already had data.
+    """
+
+    def __init__(self, target, compression=None, buffer_size=DEFAULT_BUFFER_SIZE,
+                 append=False):
+        if compression is not None and compression not in COMPRESSORS:
+            raise ValueError(f"Unknown compression {compression!r}, "
+                             f"expected one of {sorted(COMPRESSORS)}")
+        self._owns_target = isinstance(target, str)
+        self._target = open(target, "ab" if append else "wb") \
+            if self._owns_target else target
+        self.resumed = self._owns_target and self._target.tell() > 0
+        self._raw = _Unclosable(self._target, compression)
+        self.stream = io.BufferedWriter(self._raw, buffer_size)
+        self.rows_written = 0
+
+    @abc.abstractmethod
+    def write(self, row):
+        """Write one row dict"""
+
+    def write_batch(self, rows):
+        """Write a list of row dicts"""
+        for row in rows:
+            self.write(row)
+
+    def flush(self):
+        """Push every row written so far through to the target.
+
+        A compressed stream is finished here and the next write starts a
+        new one, so the file is complete up to this point (gzip, bz2 and
+        lzma readers all accept concatenated streams). Path targets are
+        also fsynced.
+        """
+        self.stream.flush()
+        self._raw.finish()
+        self._target.flush()
+        if self._owns_target:
+            os.fsync(self._target.fileno())
+
+    def close(self):
+        """Flush buffers and finish the compressed stream"""
+        if self.stream.closed:
+            return
+        self.stream.flush()
+        self._raw.finish(last=True)
+        self.stream.close()
+        if self._owns_target:
+            self._target.close()
+        else:
+            self._target.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+class NDJSONSink(Sink):
+    """One compact JSON object per line"""
+
+    def write(self, row):
+        line = json.dumps(row, separators=(",", ":"), default=_json_default)
+        self.stream.write(line.encode() + b"\n")
+        self.rows_written += 1
+
+class CSVSink(Sink):
+    """CSV with a header row taken from the first row's keys"""
+
+    def __init__(self, target, compression=None, buffer_size=DEFAULT_BUFFER_SIZE,
+                 append=False):
+        super().__init__(target, compression, buffer_size, append)
+        self._text = io.TextIOWrapper(
+            self.stream, encoding="utf-8", newline="", write_through=True)
+        self._writer = None
+
+    def write(self, row):
+        if self._writer is None:
+            self._writer = csv.DictWriter(self._text, fieldnames=list(row))
+            if not self.resumed:
+                self._writer.writeheader()
+        self._writer.writerow(row)
+        self.rows_written += 1
+
+    def close(self):
+        if not self.stream.closed:
+            self._text.detach()
+        super().close()
+
+# Binary records: b"UREC1" + u32 header length + JSON column list, then per
+# row one tagged value per column: n (NULL), i (i64), f (f64), s/b (u32
+# length + UTF-8 or raw bytes). An appended run starts with a new header.
+BINARY_MAGIC = b"UREC1"
+_U32 = struct.Struct("<I")
+_I64 = struct.Struct("<q")
+_F64 = struct.Struct("<d")
+
+class BinarySink(Sink):
+    """Compact tagged binary records; read back with read_binary_records"""
+
+    def __init__(self, target, compression=None, buffer_size=DEFAULT_BUFFER_SIZE,
+                 append=False):
+        super().__init__(target, compression, buffer_size, append)
+        self.columns = None
+
+    def write(self, row):
+        if self.columns is None:
+            self.columns = list(row)
+            header = json.dumps(self.columns).encode()
+            self.stream.write(BINARY_MAGIC + _U32.pack(len(header)) + header)
+        parts = []
+        for column in self.columns:
+            value = _plain(row[column])
+            if value is None:
+                parts.append(b"n")
+            elif isinstance(value, int):
+                parts.append(b"i" + _I64.pack(value))
+            elif isinstance(value, float):
+                parts.append(b"f" + _F64.pack(value))
+            elif isinstance(value, bytes):
+                parts.append(b"b" + _U32.pack(len(value)) + value)
+            else:
+                data = str(value).encode()
+                parts.append(b"s" + _U32.pack(len(data)) + data)
+        self.stream.write(b"".join(parts))
+        self.rows_written += 1
+
+def read_binary_records(stream):
+    """Yield row dicts from a stream written by BinarySink"""
+    def read_exact(size):
+        data = stream.read(size)
+        if len(data) != size:
+            raise ValueError("Truncated binary record stream")
+        return data
+
+    def read_header(magic):
+        if magic != BINARY_MAGIC:
+            raise ValueError("Not a binary record stream")
+        return json.loads(read_exact(_U32.unpack(read_exact(4))[0]))
+
+    magic = stream.read(len(BINARY_MAGIC))
+    if not magic:
+        return
+    columns = read_header(magic)
+    while True:
+        tag = stream.read(1)
+        if not tag:
+            return
+        if tag == BINARY_MAGIC[:1]:
+            # A run appended to the file
+            columns = read_header(tag + read_exact(len(BINARY_MAGIC) - 1))
+            continue
+        row = {}
+        for index, column in enumerate(columns):
+            if index:
+                tag = read_exact(1)
+            if tag == b"n":
+                row[column] = None
+            elif tag == b"i":
+                row[column] = _I64.unpack(read_exact(8))[0]
+            elif tag == b"f":
+                row[column] = _F64.unpack(read_exact(8))[0]
+            elif tag in (b"s", b"b"):
+                data = read_exact(_U32.unpack(read_exact(4))[0])
+                row[column] = data.decode() if tag == b"s" else data
+            else:
+                raise ValueError(f"Unknown value tag {tag!r}")
+        yield row
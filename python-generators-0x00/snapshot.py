@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""Memory-mapped columnar snapshots of user_data.
+
+A snapshot is one file: an 8-byte magic, a JSON header, then 8-byte
+aligned column sections. age is one byte per row, user_id is a fixed
+36-byte slot per row, and name/email are a u64 offsets array plus a UTF-8
+string heap. Readers mmap the file and hand out memoryview slices, so
+repeated analytics never touch the database:
+
+    python3 snapshot.py export users.snap
+    python3 snapshot.py ages users.snap
+"""
+import json
+import mmap
+import os
+import shutil
+import sys
+import tempfile
+from array import array
+from collections import Counter
+import seed
+
+try:
+    import numpy as np
+except ImportError:  # numpy only speeds up age_summary
+    np = None
+
+MAGIC = b"USNAP1\0\0"
+USER_ID_WIDTH = 36
+HEAP_COLUMNS = ("name", "email")
+ALIGNMENT = 8
+
+def _padding(size):
+    return -size % ALIGNMENT
+
+def write_snapshot(path, batches):
+    """Write (user_id, name, email, age) tuple batches as a snapshot file.
+
+    Columns are spooled to temporary files while streaming, then stitched
+    together and moved into place atomically. Returns the row count.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.TemporaryDirectory(dir=directory) as spool:
+        names = ["user_id", "age"]
+        for column in HEAP_COLUMNS:
+            names += [f"{column}.offsets", f"{column}.heap"]
+        sections = {name: open(os.path.join(spool, name), "wb")
+                    for name in names}
+        heap_sizes = dict.fromkeys(HEAP_COLUMNS, 0)
+        for column in HEAP_COLUMNS:
+            sections[f"{column}.offsets"].write(array("Q", [0]).tobytes())
+        rows = 0
+        for batch in batches:
+            sections["user_id"].write(b"".join(
+                row[0].encode().ljust(USER_ID_WIDTH, b"\0") for row in batch))
+            # bytes() rejects ages outside 0..255, matching TINYINT UNSIGNED
+            sections["age"].write(bytes(int(row[3]) for row in batch))
+            for index, column in ((1, "name"), (2, "email")):
+                encoded = [row[index].encode() for row in batch]
+                offsets = array("Q")
+                size = heap_sizes[column]
+                for value in encoded:
+                    size += len(value)
+                    offsets.append(size)
+                heap_sizes[column] = size
+                sections[f"{column}.heap"].write(b"".join(encoded))
+                sections[f"{column}.offsets"].write(offsets.tobytes())
+            rows += len(batch)
+        for file in sections.values():
+            file.close()
+
+        layout = {}
+        position = 0
+        for name in names:
+            size = os.path.getsize(os.path.join(spool, name))
+            layout[name] = [position, size]
+            position += size + _padding(size)
+        header = json.dumps({
+            "rows": rows,
+            "byteorder": sys.byteorder,
+            "user_id_width": USER_ID_WIDTH,
+            "sections": layout,
+        }).encode()
+        header += b" " * _padding(len(MAGIC) + 8 + len(header))
+
+        tmp_path = os.path.join(spool, "snapshot")
+        with open(tmp_path, "wb") as out:
+            out.write(MAGIC + len(header).to_bytes(8, "little") + header)
+            for name in names:
+                with open(os.path.join(spool, name), "rb") as section:
+                    shutil.copyfileobj(section, out, 1 << 20)
+                out.write(b"\0" * _padding(layout[name][1]))
+        os.replace(tmp_path, path)
+    return rows
+
+def export_snapshot(path, batch_size=10_000):
+    """Snapshot the whole user_data table into `path`"""
+    def batches():
+        with seed.pooled_connection() as connection:
+            cursor = connection.cursor(buffered=False)
+            try:
+                cursor.execute("SELECT user_id, name, email, age "
+                               "FROM user_data ORDER BY user_id")
+                while True:
+                    batch = cursor.fetchmany(batch_size)
+                    if not batch:
+                        break
+                    yield batch
+            finally:
+                cursor.close()
+    return write_snapshot(path, batches())
+
+class Snapshot:
+    """Read-only, memory-mapped view of a snapshot file.
+
+    Column accessors return memoryview slices of the mapping rather than
+    copies. Release any slices you kept before close(), which otherwise
+    raises BufferError.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        if bytes(self._view[:len(MAGIC)]) != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a user_data snapshot")
+        header_size = int.from_bytes(
+            self._view[len(MAGIC):len(MAGIC) + 8], "little")
+        data_start = len(MAGIC) + 8
+        header = json.loads(bytes(self._view[data_start:data_start + header_size]))
+        if header["byteorder"] != sys.byteorder:
+            self.close()
+            raise ValueError("Snapshot was written on a different byte order")
+        self.rows = header["rows"]
+        self._width = header["user_id_width"]
+        self._base = data_start + header_size
+        self._sections = header["sections"]
+
+    def section(self, name):
+        """Zero-copy memoryview of one raw column section"""
+        offset, size = self._sections[name]
+        start = self._base + offset
+        return self._view[start:start + size]
+
+    def ages(self):
+        """All ages as a memoryview of unsigned bytes"""
+        return self.section("age")
+
+    def stream_user_ages(self, batch_size=None):
+        """Yield ages one by one, or as memoryview slices of batch_size"""
+        ages = self.ages()
+        if batch_size is None:
+            yield from ages
+            return
+        for start in range(0, self.rows, batch_size):
+            yield ages[start:start + batch_size]
+
+    def strings(self, column):
+        """Yield the decoded values of a name/email heap column"""
+        offsets = self.section(f"{column}.offsets").cast("Q")
+        heap = self.section(f"{column}.heap")
+        for i in range(self.rows):
+            yield str(heap[offsets[i]:offsets[i + 1]], "utf-8")
+
+    def user_ids(self):
+        """Yield every user_id"""
+        slots = self.section("user_id")
+        width = self._width
+        for i in range(self.rows):
+            yield str(slots[i * width:(i + 1) * width], "ascii").rstrip("\0")
+
+    def stream_users(self):
+        """Yield user_data rows as dicts, in user_id order"""
+        for user_id, name, email, age in zip(
+                self.user_ids(), self.strings("name"),
+                self.strings("email"), self.ages()):
+            yield {"user_id": user_id, "name": name,
+                   "email": email, "age": age}
+
+    def age_summary(self):
+        """Exact age statistics from one pass over the age column.
+
+        Ages fit in a byte, so a 256-bucket histogram gives count, mean,
+        variance, min, max and p50/p95/p99 with the same keys as
+        stats.RunningStats.summary().
+        """
+        if np is not None:
+            ages = np.frombuffer(self.ages(), dtype=np.uint8)
+            counts = dict(enumerate(np.bincount(ages, minlength=256).tolist()))
+            del ages
+        else:
+            counts = Counter(self.ages())
+        histogram = [(age, n) for age, n in sorted(counts.items()) if n]
+        total = sum(n for _, n in histogram)
+        if not total:
+            return {"count": 0, "avg": None, "min": None, "max": None,
+                    "variance": None, "stddev": None,
+                    "p50": None, "p95": None, "p99": None}
+        mean = sum(age * n for age, n in histogram) / total
+        variance = sum(n * (age - mean) ** 2 for age, n in histogram) / total
+
+        def quantile(q):
+            rank = q * (total - 1)
+            seen = 0
+            for age, n in histogram:
+                seen += n
+                if seen > rank:
+                    return float(age)
+
+        return {
+            "count": total,
+            "avg": mean,
+            "min": float(histogram[0][0]),
+            "max": float(histogram[-1][0]),
+            "variance": variance,
+            "stddev": variance ** 0.5,
+            "p50": quantile(0.5),
+            "p95": quantile(0.95),
+            "p99": quantile(0.99),
+        }
+
+    def close(self):
+        """Unmap the file"""
+        self._view.release()
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+if __name__ == "__main__":
+    command, path = sys.argv[1], sys.argv[2]
+    if command == "export":
+        print(f"Exported {export_snapshot(path)} rows to {path}")
+    elif command == "ages":
+        with Snapshot(path) as snapshot:
+            print(snapshot.age_summary())
+    else:
+        sys.exit(f"Unknown command {command!r}, expected export or ages")
@@ -0,0 +1,164 @@
+import math
+
+def sql_summary(connection, column, table="user_data"):
+    """Compute COUNT/AVG/MIN/MAX of a column inside the database.
+
+    Only one row crosses the wire, so no values need to be streamed.
+    Column and table names are interpolated and must be trusted identifiers.
+    """
+    cursor = connection.cursor()
+    cursor.execute(
+        f"SELECT COUNT({column}), AVG({column}), MIN({column}), MAX({column}) "
+        f"FROM {table}")
+    row = cursor.fetchone()
+    cursor.close()
+    count, avg, low, high = row
+    return {
+        "count": count,
+        "avg": float(avg) if avg is not None else None,
+        "min": float(low) if low is not None else None,
+        "max": float(high) if high is not None else None,
+    }
+
+class QuantileSketch:
+    """Mergeable approximate-quantile sketch with bounded relative error.
+
+    Values are counted in logarithmic buckets (the DDSketch scheme), so any
+    reported quantile is within `relative_accuracy` of a true sample value
+    and memory grows with the value range, not the number of values.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def _key(self, value):
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, key):
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, value):
+        """Count one value"""
+        if value > 0:
+            key = self._key(value)
+            self.positive[key] = self.positive.get(key, 0) + 1
+        elif value < 0:
+            key = self._key(-value)
+            self.negative[key] = self.negative.get(key, 0) + 1
+        else:
+            self.zero_count += 1
+        self.count += 1
+
+    def merge(self, other):
+        """Fold another sketch with the same accuracy into this one"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for mine, theirs in ((self.positive, other.positive),
+                             (self.negative, other.negative)):
+            for key, count in theirs.items():
+                mine[key] = mine.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        return self
+
+    def quantile(self, q):
+        """Approximate value at quantile q (0 <= q <= 1), None when empty"""
+        if not 0 <= q <= 1:
+            raise ValueError("Quantile must be between 0 and 1")
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._value(key)
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.positive))
+
+class RunningStats:
+    """One-pass, mergeable count/mean/variance/min/max plus quantiles.
+
+    Mean and variance use Welford's update, so they stay numerically stable
+    over long streams; partial results from separate scans combine with
+    merge().
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = None
+        self.max = None
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def add(self, value):
+        """Update every statistic with one value"""
+        value = float(value)
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.sketch.add(value)
+
+    def update(self, values):
+        """Add every value from an iterable; returns self for chaining"""
+        for value in values:
+            self.add(value)
+        return self
+
+    def merge(self, other):
+        """Combine with stats gathered over a disjoint set of values"""
+        if other.count == 0:
+            return self
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self._m2 += other._m2 + delta * delta * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+        return self
+
+    @property
+    def variance(self):
+        """Population variance, None when empty"""
+        return self._m2 / self.count if self.count else None
+
+    @property
+    def stddev(self):
+        """Population standard deviation, None when empty"""
+        return math.sqrt(self._m2 / self.count) if self.count else None
+
+    def quantile(self, q):
+        """Approximate value at quantile q"""
+        return self.sketch.quantile(q)
+
+    def summary(self):
+        """Dict of every statistic, including p50/p95/p99"""
+        return {
+            "count": self.count,
+            "avg": self.mean if self.count else None,
+            "min": self.min,
+            "max": self.max,
+            "variance": self.variance,
+            "stddev": self.stddev,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
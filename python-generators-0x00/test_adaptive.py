@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Unit tests for adaptive batch sizing"""
+
+import unittest
+
+from adaptive import AdaptiveBatchSizer, estimate_row_bytes
+
+
+def rows(count, width):
+    """`count` dict rows carrying about `width` bytes each"""
+    return [{"name": "x" * width}] * count
+
+
+class TestAdaptiveBatchSizer(unittest.TestCase):
+    """Tests for AdaptiveBatchSizer"""
+
+    def test_grows_while_fetches_are_fast(self):
+        """Quick, full fetches double the size up to max_size"""
+        sizer = AdaptiveBatchSizer(max_size=1000, target_latency=0.1)
+        size = sizer.start(100)
+        for _ in range(6):
+            size = sizer.observe(rows(size, 10), 0.001)
+        self.assertEqual(size, 1000)
+
+    def test_shrinks_on_slow_fetches(self):
+        """Fetches over the target latency halve the size"""
+        sizer = AdaptiveBatchSizer(initial_size=800, min_size=100,
+                                   target_latency=0.1)
+        self.assertEqual(sizer.observe(rows(800, 10), 0.5), 400)
+        self.assertEqual(sizer.observe(rows(400, 10), 0.5), 200)
+
+    def test_memory_budget_caps_wide_rows(self):
+        """Wide rows cap the size at memory_budget / bytes_per_row"""
+        sizer = AdaptiveBatchSizer(initial_size=1000, min_size=10,
+                                   memory_budget=100_000)
+        size = sizer.observe(rows(1000, 1000), 0.001)
+        self.assertEqual(size, 100)
+
+    def test_stats_hook(self):
+        """Every fetch is reported through on_batch and history"""
+        seen = []
+        sizer = AdaptiveBatchSizer(on_batch=seen.append, keep_history=True)
+        sizer.start(200)
+        sizer.observe(rows(200, 10), 0.001)
+        self.assertEqual(seen, sizer.history)
+        self.assertEqual(seen[0]["batch_size"], 200)
+        self.assertEqual(seen[0]["next_size"], 400)
+        self.assertEqual(seen[0]["bytes_per_row"], 10)
+
+    def test_partial_batch_does_not_grow(self):
+        """The short last batch of a table is no reason to grow"""
+        sizer = AdaptiveBatchSizer(initial_size=500)
+        self.assertEqual(sizer.observe(rows(20, 10), 0.001), 500)
+
+    def test_estimate_row_bytes(self):
+        """Strings count their length, other values 8 bytes"""
+        self.assertEqual(estimate_row_bytes([("abcd", 30), ("ab", 30)]), 11)
+        self.assertEqual(estimate_row_bytes([]), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Unit tests for incremental change streams"""
+
+import re
+import unittest
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+
+import seed
+from changes import ChangeStream, decode_watermark
+from checkpoint import TableCheckpoint
+
+START = datetime(2026, 1, 1)
+ROWS = [{"user_id": f"id-{i}", "updated_at": START + timedelta(seconds=i // 2)}
+        for i in range(7)]
+
+
+class FakeTable:
+    """Connection double that answers ChangeStream's keyset query"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+        self.checkpoints = {}
+
+    def cursor(self, dictionary=False):
+        cursor = Mock()
+        cursor.execute.side_effect = self.execute
+        cursor.fetchall.side_effect = lambda: self.result
+        cursor.fetchone.side_effect = lambda: self.result
+        return cursor
+
+    def commit(self):
+        pass
+
+    def execute(self, query, params=()):
+        if "stream_checkpoints" in query:
+            return self.checkpoint_table(query, params)
+        self.queries.append(query)
+        rows = sorted(self.rows, key=lambda r: (r["updated_at"], r["user_id"]))
+        if "updated_at > %s" in query:
+            mark = (params[0], params[2])
+            rows = [r for r in rows if (r["updated_at"], r["user_id"]) > mark]
+        self.result = rows[:params[-1]]
+
+    def checkpoint_table(self, query, params):
+        """Answer TableCheckpoint's SQL the way MySQL and its driver would"""
+        for value in params:
+            if not isinstance(value, (str, int, float, datetime, type(None))):
+                raise TypeError(f"Python '{type(value).__name__}' cannot be "
+                                "converted to a MySQL type")
+        self.result = None
+        if query.startswith("CREATE TABLE"):
+            self.key_width = int(re.search(r"last_key VARCHAR\((\d+)\)",
+                                           query).group(1))
+        elif query.startswith("INSERT"):
+            job, last_key = params
+            if len(last_key) > self.key_width:
+                raise ValueError("Data too long for column 'last_key'")
+            self.checkpoints[job] = last_key
+        elif query.startswith("SELECT"):
+            saved = self.checkpoints.get(params[0])
+            self.result = None if saved is None else (saved,)
+
+
+class MemoryCheckpoint:
+    """In-memory checkpoint store"""
+
+    def __init__(self):
+        self.value = None
+
+    def load(self):
+        return self.value
+
+    def save(self, value):
+        self.value = value
+
+
+class TestChangeStream(unittest.TestCase):
+    """Tests for ChangeStream"""
+
+    def setUp(self):
+        self.table = FakeTable(list(ROWS))
+
+        @contextmanager
+        def pooled_connection():
+            yield self.table
+        patcher = patch.object(seed, "pooled_connection", pooled_connection)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_second_run_only_sees_new_rows(self):
+        """A rerun with the same checkpoint yields only the delta"""
+        checkpoint = MemoryCheckpoint()
+        first = sum(ChangeStream(checkpoint, batch_size=3).batches(), [])
+        self.assertEqual(first, ROWS)
+        self.assertEqual(checkpoint.value,
+                         f"{ROWS[-1]['updated_at'].isoformat()}|id-6")
+
+        new_row = {"user_id": "id-0", "updated_at": START + timedelta(hours=1)}
+        self.table.rows.append(new_row)
+        second = sum(ChangeStream(checkpoint, batch_size=3).batches(), [])
+        self.assertEqual(second, [new_row])
+
+    def test_table_checkpoint(self):
+        """A full-width watermark round-trips through TableCheckpoint"""
+        user_id = "0f3c2a9e-6d1b-4c8e-9a57-3b2f1d0e4c6a"
+        updated_at = START.replace(microsecond=123456)
+        self.table.rows = [{"user_id": user_id, "updated_at": updated_at}]
+        checkpoint = TableCheckpoint("changes")
+        self.assertEqual(len(list(ChangeStream(checkpoint).batches())), 1)
+        self.assertEqual(decode_watermark(checkpoint.load()),
+                         (updated_at, user_id))
+        self.assertEqual(list(ChangeStream(checkpoint).batches()), [])
+
+    def test_reads_older_list_watermarks(self):
+        """Checkpoints saved as [iso, user_id] lists still load"""
+        self.assertEqual(decode_watermark([START.isoformat(), "id-1"]),
+                         (START, "id-1"))
+
+    def test_rows_sharing_a_timestamp_are_not_skipped(self):
+        """Ties on updated_at are broken by user_id across page boundaries"""
+        stream = ChangeStream(batch_size=1)
+        seen = [row["user_id"] for batch in stream.batches() for row in batch]
+        self.assertEqual(seen, [row["user_id"] for row in ROWS])
+
+    def test_tail_stops_on_event(self):
+        """tail() polls until the stop event is set"""
+        stop = Mock()
+        stop.is_set.side_effect = [False, False, True]
+        batches = list(ChangeStream(batch_size=10).tail(0, stop=stop))
+        self.assertEqual(len(batches), 1)
+        stop.wait.assert_called_once_with(0)
+
+    def test_requires_watermark_columns(self):
+        """Projections must keep the watermark columns"""
+        with self.assertRaises(ValueError):
+            ChangeStream(columns=("name",))
+
+
+if __name__ == "__main__":
+    unittest.main()
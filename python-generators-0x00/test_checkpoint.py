@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Unit tests for checkpointed streams"""
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from checkpoint import FileCheckpoint, checkpointed
+from sinks import NDJSONSink
+
+batch_processing = __import__('1-batch_processing')
+
+USERS = [{"user_id": f"id-{i:02d}", "age": 20 + i} for i in range(10)]
+
+
+def keyset_source(batch_size, columns=None, where=None, params=(),
+                  ordered=False):
+    """Serve USERS in key order, honouring a trailing user_id > %s bound"""
+    rows = USERS
+    if where and where.endswith("user_id > %s"):
+        rows = [u for u in rows if u["user_id"] > params[-1]]
+    for start in range(0, len(rows), batch_size):
+        yield rows[start:start + batch_size]
+
+
+class TestCheckpointed(unittest.TestCase):
+    """Tests for FileCheckpoint and checkpointed"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.path = os.path.join(directory, "batch.ckpt")
+        self.checkpoint = FileCheckpoint(self.path)
+
+    def test_resumes_after_crash(self):
+        """A restarted run only sees batches the crashed run did not finish"""
+        source = checkpointed(keyset_source, self.checkpoint)
+        seen = []
+        for batch in source(3):
+            if len(seen) == 6:
+                break  # crash while handling the third batch
+            seen.extend(batch)
+        self.assertEqual(self.checkpoint.load(), "id-05")
+        resumed = sum(checkpointed(keyset_source, self.checkpoint)(3), [])
+        self.assertEqual(resumed, USERS[6:])
+        self.assertEqual(self.checkpoint.load(), "id-09")
+
+    def test_save_interval(self):
+        """every=N only persists every Nth finished batch"""
+        saved = []
+        self.checkpoint.save = saved.append
+        list(checkpointed(keyset_source, self.checkpoint, every=2)(2))
+        self.assertEqual(saved, ["id-03", "id-07", "id-09"])
+
+    def test_requires_user_id(self):
+        """A projection without the watermark column is rejected"""
+        source = checkpointed(keyset_source, self.checkpoint)
+        with self.assertRaises(ValueError):
+            next(source(3, columns=("name",)))
+
+    def test_clear(self):
+        """clear() restarts from the beginning"""
+        self.checkpoint.save("id-04")
+        self.checkpoint.clear()
+        self.assertIsNone(self.checkpoint.load())
+
+    def test_sink_resumes_without_losing_rows(self):
+        """Checkpointed batches are on disk, and a resumed run appends"""
+        output = os.path.join(os.path.dirname(self.path), "users.ndjson")
+
+        class CrashingSink(NDJSONSink):
+            def write_batch(self, rows):
+                if self.rows_written == 6:
+                    raise RuntimeError("crash")
+                super().write_batch(rows)
+
+        with patch.object(batch_processing, "stream_users_in_batches",
+                          keyset_source):
+            sink = CrashingSink(output)
+            with self.assertRaises(RuntimeError):
+                batch_processing.batch_processing(3, self.checkpoint, sink)
+            self.assertEqual(self.checkpoint.load(), "id-05")
+            with open(output) as file:
+                self.assertEqual(len(file.readlines()), 6)
+            with NDJSONSink(output, append=True) as sink:
+                batch_processing.batch_processing(3, self.checkpoint, sink)
+        with open(output) as file:
+            self.assertEqual([json.loads(line) for line in file], USERS)
+
+
+if __name__ == "__main__":
+    unittest.main()
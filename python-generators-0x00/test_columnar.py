@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Unit tests for the columnar batch converter"""
+
+import unittest
+from decimal import Decimal
+
+import columnar
+
+ROWS = [
+    ("id-1", "Ann", "ann@example.com", Decimal("22")),
+    ("id-2", "Bob", "bob@example.com", Decimal("31")),
+    ("id-3", "Cid", "cid@example.com", Decimal("47")),
+]
+COLUMNS = ("user_id", "name", "email", "age")
+
+
+@unittest.skipIf(columnar.np is None, "numpy is not installed")
+class TestBatchConverter(unittest.TestCase):
+    """Tests for batch_converter"""
+
+    def test_columns_layout(self):
+        """Each column becomes its own array"""
+        batch = columnar.batch_converter(COLUMNS, "columns")(ROWS)
+        self.assertEqual(list(batch), list(COLUMNS))
+        ages = batch["age"]
+        self.assertEqual(ages[ages > 25].tolist(), [31, 47])
+        self.assertAlmostEqual(float(ages.mean()), 100 / 3)
+
+    def test_structured_layout(self):
+        """One structured array holds the whole batch"""
+        batch = columnar.batch_converter(COLUMNS, "structured")(ROWS)
+        self.assertEqual(batch.dtype.names, COLUMNS)
+        self.assertEqual(batch[1]["name"], "Bob")
+
+    def test_dtype_override(self):
+        """Column dtypes can be overridden per call"""
+        convert = columnar.batch_converter(COLUMNS, dtypes={"age": "f8"})
+        self.assertEqual(convert(ROWS)["age"].dtype.kind, "f")
+
+    def test_unknown_layout(self):
+        """Unknown layouts are rejected up front"""
+        with self.assertRaises(ValueError):
+            columnar.batch_converter(COLUMNS, "rows")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Unit tests for single-scan fan-out"""
+
+import threading
+import time
+import unittest
+
+import stats
+from fanout import fan_out
+
+USERS = [{"user_id": i, "age": 18 + i % 60} for i in range(1000)]
+
+
+def scan(log, batch_size=100):
+    """Batch source that records every batch it produces"""
+    for start in range(0, len(USERS), batch_size):
+        log.append(start)
+        yield USERS[start:start + batch_size]
+
+
+class TestFanOut(unittest.TestCase):
+    """Tests for fan_out"""
+
+    def test_one_scan_feeds_every_consumer(self):
+        """All consumers see every row from a single pass"""
+        log = []
+        results = fan_out(scan(log), {
+            "adults": lambda rows: [r for r in rows if r["age"] > 25],
+            "ages": lambda rows: stats.RunningStats().update(
+                r["age"] for r in rows),
+        })
+        self.assertEqual(len(log), 10)
+        self.assertEqual(results["adults"],
+                         [u for u in USERS if u["age"] > 25])
+        self.assertEqual(results["ages"].count, len(USERS))
+
+    def test_backpressure_from_slowest_consumer(self):
+        """The scan never runs more than the buffer ahead of a consumer"""
+        log = []
+        consumed = []
+        lead = []
+
+        def slow(rows):
+            for index, row in enumerate(rows):
+                if index % 100 == 0:
+                    lead.append(len(log) - len(consumed))
+                    consumed.append(index)
+                    time.sleep(0.01)
+            return len(consumed)
+
+        fan_out(scan(log), {"slow": slow, "fast": list}, buffer_size=2)
+        self.assertLessEqual(max(lead), 2 + 2)
+
+    def test_consumer_error_stops_the_scan(self):
+        """A failing consumer aborts the scan and its error is raised"""
+        log = []
+
+        def broken(rows):
+            next(rows)
+            raise KeyError("boom")
+
+        with self.assertRaises(KeyError):
+            fan_out(scan(log), {"broken": broken, "ok": list}, buffer_size=1)
+        self.assertLess(len(log), 10)
+
+    def test_partial_consumers_do_not_block(self):
+        """A consumer that stops reading early does not stall the others"""
+        results = fan_out(scan([]), {"first": next, "all": list})
+        self.assertEqual(results["first"], USERS[0])
+        self.assertEqual(len(results["all"]), len(USERS))
+        self.assertFalse([t for t in threading.enumerate()
+                          if t.name.startswith("fanout-")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Unit tests for the 2-lazy_paginate keyset paginator"""
+
+import unittest
+from contextlib import contextmanager
+from unittest.mock import patch, Mock
+
+import seed
+
+paginate_module = __import__('2-lazy_paginate')
+
+USERS = [{"user_id": f"id-{i:03d}", "age": i} for i in range(10)]
+
+
+def fake_page(connection, page_size, after=None):
+    """Serve USERS the way the keyset query would"""
+    rows = [u for u in USERS if after is None or u["user_id"] > after]
+    return rows[:page_size]
+
+
+@contextmanager
+def fake_pooled_connection():
+    """Lend out a dummy connection"""
+    yield Mock()
+
+
+@patch.object(seed, "pooled_connection", fake_pooled_connection)
+@patch.object(paginate_module, "paginate_users_after", side_effect=fake_page)
+class TestKeysetPaginate(unittest.TestCase):
+    """Tests for keyset_paginate and lazy_paginate"""
+
+    def test_walks_every_row_once(self, mock_page):
+        """A full walk returns all rows in user_id order"""
+        pages = list(paginate_module.lazy_paginate(4))
+        self.assertEqual([len(page) for page in pages], [4, 4, 2])
+        self.assertEqual(sum(pages, []), USERS)
+
+    def test_one_connection_per_walk(self, mock_page):
+        """Every page of a walk is read over the same connection"""
+        list(paginate_module.lazy_paginate(4))
+        connections = {c.args[0] for c in mock_page.call_args_list}
+        self.assertEqual(len(connections), 1)
+
+    def test_resume_from_token(self, mock_page):
+        """A token from one walk resumes right after its page"""
+        walk = paginate_module.keyset_paginate(3)
+        _, token = next(walk)
+        resumed = list(paginate_module.lazy_paginate(3, resume_token=token))
+        self.assertEqual(sum(resumed, []), USERS[3:])
+
+    def test_invalid_token(self, mock_page):
+        """Garbage tokens raise ValueError"""
+        with self.assertRaises(ValueError):
+            list(paginate_module.lazy_paginate(3, resume_token="not-a-token"))
+
+
+if __name__ == "__main__":
+    unittest.main()
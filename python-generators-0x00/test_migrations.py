@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Unit tests for the schema migrations"""
+
+import unittest
+from unittest.mock import Mock, patch
+
+import migrations
+
+
+def schema_cursor(age_type, indexes, columns=()):
+    """Cursor mock answering information_schema lookups"""
+    cursor = Mock()
+    state = {}
+
+    def execute(query, params=()):
+        if "information_schema.COLUMNS" in query:
+            if params[1] == "age":
+                state["row"] = (age_type,)
+            else:
+                state["row"] = (1,) if params[1] in columns else None
+        elif "information_schema.STATISTICS" in query:
+            state["row"] = (1,) if params[1] in indexes else None
+        else:
+            state["row"] = None
+
+    cursor.execute.side_effect = execute
+    cursor.fetchone.side_effect = lambda: state["row"]
+    return cursor
+
+
+def ddl(cursor):
+    """Statements other than schema lookups"""
+    return [c.args[0] for c in cursor.execute.call_args_list
+            if "information_schema" not in c.args[0]]
+
+
+class TestMigrationSteps(unittest.TestCase):
+    """Each step changes a legacy schema and skips an up-to-date one"""
+
+    def test_legacy_schema_is_upgraded(self):
+        """Every change runs against the original table"""
+        cursor = schema_cursor("decimal(10,0)", {"PRIMARY", "user_id"})
+        for _, _, step in migrations.MIGRATIONS:
+            step(cursor)
+        self.assertEqual(ddl(cursor), [
+            "ALTER TABLE user_data MODIFY age TINYINT UNSIGNED NOT NULL",
+            "ALTER TABLE user_data DROP INDEX user_id",
+            "CREATE INDEX idx_user_data_age ON user_data (age, name, email)",
+            "ALTER TABLE user_data ADD COLUMN updated_at TIMESTAMP(6) "
+            "NOT NULL DEFAULT CURRENT_TIMESTAMP(6) "
+            "ON UPDATE CURRENT_TIMESTAMP(6), "
+            "ADD INDEX idx_user_data_updated_at (updated_at, user_id)",
+        ])
+
+    def test_current_schema_is_left_alone(self):
+        """A table from the current create_table needs no DDL"""
+        cursor = schema_cursor(
+            "tinyint(3) unsigned", {"PRIMARY", "idx_user_data_age"},
+            columns={"updated_at"})
+        for _, _, step in migrations.MIGRATIONS:
+            step(cursor)
+        self.assertEqual(ddl(cursor), [])
+
+    def test_widens_checkpoint_key(self):
+        """An old 36-character last_key column is widened once"""
+        for column_type, expected in (("varchar(36)", 1), ("varchar(96)", 0)):
+            cursor = Mock()
+            cursor.fetchone.side_effect = [(1,), (column_type,)]
+            migrations.widen_checkpoint_key(cursor)
+            self.assertEqual(len(ddl(cursor)), expected)
+
+
+class TestMigrate(unittest.TestCase):
+    """Tests for migrate"""
+
+    def test_applies_only_pending_versions(self):
+        """Versions at or below the recorded one are skipped"""
+        connection = Mock()
+        steps = [Mock(), Mock(), Mock()]
+        versions = [(1, "one", steps[0]), (2, "two", steps[1]),
+                    (3, "three", steps[2])]
+        with patch.object(migrations, "MIGRATIONS", versions), \
+                patch.object(migrations, "current_version", return_value=1):
+            applied = migrations.migrate(connection, target=2)
+        self.assertEqual(applied, [2])
+        steps[0].assert_not_called()
+        steps[1].assert_called_once()
+        steps[2].assert_not_called()
+        connection.commit.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Unit tests for the parallel scan helpers"""
+
+import functools
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import Mock
+
+import parallel
+
+
+class SQLiteCursor:
+    """Just enough of a mysql.connector cursor, over sqlite3"""
+
+    def __init__(self, connection, dictionary):
+        self.cursor = connection.cursor()
+        self.dictionary = dictionary
+
+    def execute(self, query, params=()):
+        self.cursor.execute(query.replace("%s", "?"), params)
+
+    def _rows(self, rows):
+        if not self.dictionary:
+            return rows
+        names = [column[0] for column in self.cursor.description]
+        return [dict(zip(names, row)) for row in rows]
+
+    def fetchall(self):
+        return self._rows(self.cursor.fetchall())
+
+    def fetchmany(self, size):
+        return self._rows(self.cursor.fetchmany(size))
+
+    def close(self):
+        self.cursor.close()
+
+
+class SQLiteConnection:
+    """mysql.connector-style connection to a SQLite file"""
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path)
+
+    def cursor(self, dictionary=False):
+        return SQLiteCursor(self.connection, dictionary)
+
+    def close(self):
+        self.connection.close()
+
+
+def connect_sqlite(path):
+    """Module-level, so spawned scan workers can unpickle it"""
+    return SQLiteConnection(path)
+
+
+class TestShardPlanning(unittest.TestCase):
+    """Tests for key_ranges and shard_query"""
+
+    def test_key_ranges_cover_the_whole_table(self):
+        """Tile starts become half-open ranges with open outer ends"""
+        cursor = Mock()
+        cursor.fetchall.return_value = [("a",), ("f",), ("k",)]
+        connection = Mock(cursor=Mock(return_value=cursor))
+        self.assertEqual(parallel.key_ranges(connection, 3),
+                         [(None, "f"), ("f", "k"), ("k", None)])
+
+    def test_shard_query_bounds_and_pushdown(self):
+        """Range bounds are appended after the caller's WHERE params"""
+        query, params = parallel.shard_query(
+            "f", "k", columns=("user_id", "age"), where="`age` > %s",
+            params=(25,))
+        self.assertEqual(
+            query,
+            "SELECT `user_id`, `age` FROM user_data WHERE (`age` > %s) "
+            "AND user_id >= %s AND user_id < %s ORDER BY user_id")
+        self.assertEqual(params, (25, "f", "k"))
+
+    def test_open_shard(self):
+        """A single open range scans the whole table"""
+        query, params = parallel.shard_query(None, None)
+        self.assertEqual(query, "SELECT * FROM user_data ORDER BY user_id")
+        self.assertEqual(params, ())
+
+
+class TestParallelScan(unittest.TestCase):
+    """End-to-end scans through spawned workers on a SQLite table"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "users.db")
+        with sqlite3.connect(path) as connection:
+            connection.execute(
+                "CREATE TABLE user_data (user_id TEXT PRIMARY KEY, age INT)")
+            connection.executemany(
+                "INSERT INTO user_data VALUES (?, ?)",
+                [(f"u{i:03}", i % 50) for i in range(30)])
+        connection.close()
+        self.connect = functools.partial(connect_sqlite, path)
+        self.ids = [f"u{i:03}" for i in range(30)]
+
+    def scan(self, **kwargs):
+        return list(parallel.parallel_scan(
+            4, shards=3, connect=self.connect, **kwargs))
+
+    def test_ordered_merge_keeps_key_order(self):
+        """Shards are merged in user_id order, even with one-batch queues"""
+        batches = self.scan(ordered=True, queue_size=1, processes=2)
+        self.assertTrue(all(len(batch) <= 4 for batch in batches))
+        self.assertEqual([row["user_id"] for batch in batches for row in batch],
+                         self.ids)
+
+    def test_unordered_merge_yields_every_row(self):
+        """Unordered mode interleaves shards but loses nothing"""
+        batches = self.scan(columns=("user_id",), where="age < %s",
+                            params=(20,))
+        self.assertEqual(
+            sorted(row["user_id"] for batch in batches for row in batch),
+            [user_id for i, user_id in enumerate(self.ids) if i < 20])
+
+    def test_worker_error_is_raised(self):
+        """A failing shard surfaces as RuntimeError in the consumer"""
+        with self.assertRaisesRegex(RuntimeError, "Shard 0 failed"):
+            self.scan(ordered=True, where="missing > %s", params=(0,))
+
+
+if __name__ == "__main__":
+    unittest.main()
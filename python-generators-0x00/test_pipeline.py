@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Unit tests for the pipeline module"""
+
+import unittest
+from unittest.mock import Mock
+
+from pipeline import Pipeline, col
+
+USERS = [
+    {"user_id": "a", "name": "Ann", "email": "ann@example.com", "age": 22},
+    {"user_id": "b", "name": "Bob", "email": "bob@example.com", "age": 31},
+    {"user_id": "c", "name": "Cid", "email": "cid@example.com", "age": 47},
+]
+
+
+def fake_source(rows=USERS):
+    """Source mock that ignores pushdown and serves rows in two batches"""
+    return Mock(side_effect=lambda batch_size, columns, where, params: iter(
+        [rows[:2], rows[2:]]))
+
+
+class TestPipeline(unittest.TestCase):
+    """Tests for Pipeline compilation and execution"""
+
+    def test_pushes_conditions_and_columns_into_sql(self):
+        """Leading conditions and selects become WHERE and SELECT lists"""
+        pipeline = (Pipeline(fake_source())
+                    .filter(col("age") > 25)
+                    .filter(col("name").isin(["Bob", "Cid"]))
+                    .select("name", "age"))
+        columns, where, params, python_steps = pipeline.compile()
+        self.assertEqual(columns, ("name", "age"))
+        self.assertEqual(where, "`age` > %s AND `name` IN (%s, %s)")
+        self.assertEqual(params, (25, "Bob", "Cid"))
+        self.assertEqual(python_steps, [])
+
+    def test_source_receives_compiled_query(self):
+        """run() hands the compiled pieces to the source"""
+        source = fake_source()
+        list(Pipeline(source).filter(col("age") >= 30).select("name").run(50))
+        source.assert_called_once_with(
+            50, columns=("name",), where="`age` >= %s", params=(30,))
+
+    def test_python_fallback_for_callables(self):
+        """Untranslatable predicates run in Python after the fetch"""
+        pipeline = Pipeline(fake_source()).filter(
+            lambda user: user["name"].startswith("C"))
+        _, where, _, python_steps = pipeline.compile()
+        self.assertIsNone(where)
+        self.assertEqual(len(python_steps), 1)
+        self.assertEqual([u["user_id"] for u in pipeline.run()], ["c"])
+
+    def test_conditions_after_map_stay_in_python(self):
+        """A map changes rows, so later conditions are not pushed down"""
+        pipeline = (Pipeline(fake_source())
+                    .map(lambda user: dict(user, age=user["age"] * 2))
+                    .filter(col("age") > 60))
+        _, where, _, _ = pipeline.compile()
+        self.assertIsNone(where)
+        self.assertEqual([u["user_id"] for u in pipeline.run()], ["b", "c"])
+
+    def test_batch(self):
+        """batch() regroups output rows"""
+        batches = list(Pipeline(fake_source()).batch(2).run())
+        self.assertEqual([len(batch) for batch in batches], [2, 1])
+
+    def test_rejects_bad_identifiers(self):
+        """Column names are never interpolated unchecked"""
+        with self.assertRaises(ValueError):
+            col("age; DROP TABLE user_data") > 1
+        with self.assertRaises(ValueError):
+            Pipeline(fake_source()).select("name`")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Unit tests for the prefetch wrapper"""
+
+import time
+import unittest
+
+from prefetch import prefetch
+
+
+def slow_source(items, delay, log=None):
+    """Generator that sleeps before each item, recording when it closes"""
+    try:
+        for item in range(items):
+            time.sleep(delay)
+            yield item
+    finally:
+        if log is not None:
+            log.append("closed")
+
+
+class TestPrefetch(unittest.TestCase):
+    """Tests for prefetch"""
+
+    def test_overlaps_fetch_and_processing(self):
+        """Total time approaches max(fetch, process), not their sum"""
+        start = time.perf_counter()
+        for _ in prefetch(slow_source(10, 0.05), depth=2):
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - start
+        self.assertLess(elapsed, 0.85)
+
+    def test_preserves_order(self):
+        """Items arrive in source order"""
+        self.assertEqual(list(prefetch(iter(range(100)), depth=3)),
+                         list(range(100)))
+
+    def test_reraises_source_errors(self):
+        """Exceptions in the source surface in the consumer"""
+        def failing():
+            yield 1
+            raise KeyError("boom")
+        stream = prefetch(failing())
+        self.assertEqual(next(stream), 1)
+        with self.assertRaises(KeyError):
+            next(stream)
+
+    def test_early_close_closes_source(self):
+        """Abandoning the wrapper closes the underlying generator"""
+        log = []
+        stream = prefetch(slow_source(1000, 0, log), depth=2)
+        next(stream)
+        stream.close()
+        self.assertEqual(log, ["closed"])
+
+
+if __name__ == "__main__":
+    unittest.main()
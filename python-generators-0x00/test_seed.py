@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Unit tests for the seed connection pool helpers"""
+
+import unittest
+from unittest.mock import patch, Mock
+
+import mysql.connector
+import seed
+
+
+class TestPooledConnection(unittest.TestCase):
+    """Tests for seed.pooled_connection"""
+
+    def test_checks_liveness_and_releases(self):
+        """Borrowed connections are pinged and handed back on exit"""
+        connection = Mock()
+        pool = Mock(get_connection=Mock(return_value=connection))
+        with patch.object(seed, "get_pool", return_value=pool):
+            with seed.pooled_connection() as borrowed:
+                self.assertIs(borrowed, connection)
+                connection.close.assert_not_called()
+        connection.ping.assert_called_once_with(
+            reconnect=True, attempts=2, delay=0)
+        connection.close.assert_called_once()
+
+    def test_waits_for_a_free_connection(self):
+        """An exhausted pool is retried until a connection frees up"""
+        connection = Mock()
+        pool = Mock(get_connection=Mock(side_effect=[
+            mysql.connector.errors.PoolError("exhausted"), connection]))
+        with patch.object(seed, "get_pool", return_value=pool):
+            with seed.pooled_connection(poll_interval=0) as borrowed:
+                self.assertIs(borrowed, connection)
+        self.assertEqual(pool.get_connection.call_count, 2)
+
+    def test_gives_up_after_timeout(self):
+        """PoolError propagates once the wait exceeds the timeout"""
+        pool = Mock(get_connection=Mock(
+            side_effect=mysql.connector.errors.PoolError("exhausted")))
+        with patch.object(seed, "get_pool", return_value=pool):
+            with self.assertRaises(mysql.connector.errors.PoolError):
+                with seed.pooled_connection(timeout=0):
+                    pass
+
+
+class TestBulkInsert(unittest.TestCase):
+    """Tests for the chunked bulk loader"""
+
+    def test_insert_rows_chunks_and_commits(self):
+        """Rows go out in executemany chunks with a commit per chunk"""
+        cursor = Mock()
+        connection = Mock(cursor=Mock(return_value=cursor))
+        rows = [(str(i), "name", "email", i) for i in range(7)]
+        total = seed.insert_rows(connection, iter(rows), chunk_size=3)
+        self.assertEqual(total, 7)
+        sizes = [len(c.args[1]) for c in cursor.executemany.call_args_list]
+        self.assertEqual(sizes, [3, 3, 1])
+        self.assertEqual(connection.commit.call_count, 3)
+        self.assertIn("INSERT IGNORE",
+                      cursor.executemany.call_args.args[0])
+
+    def test_upsert_mode(self):
+        """on_duplicate='update' overwrites existing users"""
+        cursor = Mock()
+        connection = Mock(cursor=Mock(return_value=cursor))
+        seed.insert_rows(connection, [("1", "n", "e", 30)],
+                         on_duplicate="update")
+        self.assertIn("ON DUPLICATE KEY UPDATE",
+                      cursor.executemany.call_args.args[0])
+
+    def test_load_data_falls_back_to_batches(self):
+        """A refused LOAD DATA falls back to batched inserts"""
+        connection = Mock()
+        with patch.object(seed, "load_data_infile", side_effect=(
+                mysql.connector.Error("not allowed"))), \
+                patch.object(seed, "read_csv_rows", return_value=[]), \
+                patch.object(seed, "insert_rows", return_value=5) as insert:
+            rows = seed.insert_data(connection, "users.csv",
+                                    use_load_data=True)
+        self.assertEqual(rows, 5)
+        connection.rollback.assert_called_once()
+        insert.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
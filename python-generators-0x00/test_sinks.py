@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Unit tests for the output sinks"""
+
+import bz2
+import csv
+import gzip
+import io
+import json
+import lzma
+import os
+import tempfile
+import unittest
+from decimal import Decimal
+
+from sinks import (BinarySink, CSVSink, NDJSONSink, Sink,
+                   read_binary_records)
+
+ROWS = [
+    {"user_id": "id-1", "name": "Ann", "email": None, "age": Decimal("31")},
+    {"user_id": "id-2", "name": "Bób", "email": "b@x.io", "age": Decimal("47")},
+]
+PLAIN_ROWS = [dict(row, age=int(row["age"])) for row in ROWS]
+
+
+class TestSinks(unittest.TestCase):
+    """Round-trip tests for each sink"""
+
+    def test_ndjson(self):
+        """One JSON object per line, Decimals as numbers"""
+        out = io.BytesIO()
+        with NDJSONSink(out) as sink:
+            sink.write_batch(ROWS)
+        lines = out.getvalue().decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], PLAIN_ROWS)
+        self.assertEqual(sink.rows_written, 2)
+
+    def test_csv(self):
+        """Header from the first row, then one line per row"""
+        out = io.BytesIO()
+        with CSVSink(out) as sink:
+            sink.write_batch(ROWS)
+        rows = list(csv.DictReader(io.StringIO(out.getvalue().decode())))
+        self.assertEqual([row["name"] for row in rows], ["Ann", "Bób"])
+        self.assertEqual(rows[1]["age"], "47")
+
+    def test_binary_round_trip(self):
+        """read_binary_records restores what BinarySink wrote"""
+        out = io.BytesIO()
+        with BinarySink(out) as sink:
+            sink.write_batch(ROWS)
+        out.seek(0)
+        self.assertEqual(list(read_binary_records(out)), PLAIN_ROWS)
+
+    def test_gzip_compression(self):
+        """Compressed output decompresses to the plain output"""
+        out = io.BytesIO()
+        with NDJSONSink(out, compression="gzip") as sink:
+            sink.write_batch(ROWS)
+        lines = gzip.decompress(out.getvalue()).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+
+    def test_buffers_writes(self):
+        """Rows reach the target in one large write, not one per row"""
+        writes = []
+
+        class Recorder(io.RawIOBase):
+            def writable(self):
+                return True
+
+            def write(self, data):
+                writes.append(len(data))
+                return len(data)
+
+        with NDJSONSink(Recorder(), buffer_size=1 << 16) as sink:
+            for _ in range(500):
+                sink.write_batch(ROWS)
+        self.assertEqual(len(writes), 1)
+
+    def test_leaves_passed_file_open(self):
+        """Sinks do not close file objects they were given"""
+        out = io.BytesIO()
+        NDJSONSink(out).close()
+        self.assertFalse(out.closed)
+
+    def test_flush_reaches_the_file(self):
+        """Flushed rows are readable before the sink is closed"""
+        openers = {"gzip": gzip.open, "bz2": bz2.open, "lzma": lzma.open}
+        with tempfile.TemporaryDirectory() as directory:
+            for compression, opener in openers.items():
+                path = os.path.join(directory, f"users.{compression}")
+                with NDJSONSink(path, compression=compression) as sink:
+                    sink.write_batch(ROWS[:1])
+                    sink.flush()
+                    with opener(path) as file:
+                        self.assertEqual(len(file.readlines()), 1)
+                    sink.write_batch(ROWS[1:])
+                with opener(path) as file:
+                    self.assertEqual(
+                        [json.loads(line) for line in file], PLAIN_ROWS)
+                NDJSONSink(path, compression=compression).close()
+                with opener(path) as file:
+                    self.assertEqual(file.read(), b"")
+
+    def test_append_continues_a_file(self):
+        """append=True keeps earlier output and writes headers only once"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "users.csv")
+            for rows in (ROWS[:1], ROWS[1:]):
+                with CSVSink(path, append=True) as sink:
+                    sink.write_batch(rows)
+            with open(path, newline="", encoding="utf-8") as file:
+                self.assertEqual(len(list(csv.DictReader(file))), 2)
+
+            path = os.path.join(directory, "users.bin")
+            for rows in (ROWS[:1], ROWS[1:]):
+                with BinarySink(path, append=True) as sink:
+                    sink.write_batch(rows)
+            with open(path, "rb") as file:
+                self.assertEqual(list(read_binary_records(file)), PLAIN_ROWS)
+
+    def test_sink_is_abstract(self):
+        """The base class needs a write() before it can be used"""
+        with self.assertRaises(TypeError):
+            Sink(io.BytesIO())
+
+
+if __name__ == "__main__":
+    unittest.main()
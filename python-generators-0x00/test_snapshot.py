@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Unit tests for memory-mapped user_data snapshots"""
+
+import os
+import statistics
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import snapshot
+
+USERS = [
+    (f"{i:08d}-0000-4000-8000-000000000000", f"Üser {i}",
+     f"user{i}@example.com", 18 + i % 90)
+    for i in range(2500)
+]
+
+
+class TestSnapshot(unittest.TestCase):
+    """Round-trip tests for write_snapshot and Snapshot"""
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "users.snap")
+        batches = [USERS[i:i + 1000] for i in range(0, len(USERS), 1000)]
+        self.rows = snapshot.write_snapshot(self.path, batches)
+
+    def test_round_trip(self):
+        """Rows read back from the mapping match what was written"""
+        self.assertEqual(self.rows, len(USERS))
+        with snapshot.Snapshot(self.path) as users:
+            rows = [tuple(row.values()) for row in users.stream_users()]
+        self.assertEqual(rows, USERS)
+
+    def test_age_batches_are_zero_copy_views(self):
+        """Age batches are memoryview slices of the mapping"""
+        with snapshot.Snapshot(self.path) as users:
+            batches = list(users.stream_user_ages(batch_size=1000))
+            self.assertTrue(all(isinstance(b, memoryview) for b in batches))
+            self.assertEqual([len(b) for b in batches], [1000, 1000, 500])
+            self.assertEqual(sum(sum(b) for b in batches),
+                             sum(u[3] for u in USERS))
+            for batch in batches:
+                batch.release()
+
+    def test_age_summary_is_exact(self):
+        """The histogram summary matches exact statistics"""
+        ages = [u[3] for u in USERS]
+        for numpy in (snapshot.np, None):
+            with patch.object(snapshot, "np", numpy), \
+                    snapshot.Snapshot(self.path) as users:
+                summary = users.age_summary()
+            self.assertEqual(summary["count"], len(ages))
+            self.assertAlmostEqual(summary["avg"], statistics.fmean(ages))
+            self.assertAlmostEqual(summary["variance"],
+                                   statistics.pvariance(ages))
+            self.assertEqual(summary["p50"],
+                             sorted(ages)[int(0.5 * (len(ages) - 1))])
+
+    def test_rejects_other_files(self):
+        """Non-snapshot files are refused"""
+        with open(self.path, "wb") as file:
+            file.write(b"not a snapshot at all")
+        with self.assertRaises(ValueError):
+            snapshot.Snapshot(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
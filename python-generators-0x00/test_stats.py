@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Unit tests for the stats module"""
+
+import random
+import statistics
+import unittest
+from unittest.mock import Mock
+
+import stats
+
+
+class TestRunningStats(unittest.TestCase):
+    """Tests for RunningStats and QuantileSketch"""
+
+    def setUp(self):
+        rng = random.Random(42)
+        self.values = [rng.randint(18, 120) for _ in range(5000)]
+
+    def test_matches_exact_statistics(self):
+        """One pass gives the exact mean, variance, min and max"""
+        summary = stats.RunningStats().update(self.values).summary()
+        self.assertEqual(summary["count"], len(self.values))
+        self.assertAlmostEqual(summary["avg"], statistics.fmean(self.values))
+        self.assertAlmostEqual(summary["variance"],
+                               statistics.pvariance(self.values))
+        self.assertEqual(summary["min"], min(self.values))
+        self.assertEqual(summary["max"], max(self.values))
+
+    def test_quantiles_within_relative_accuracy(self):
+        """p50/p95/p99 stay within the sketch's relative error"""
+        running = stats.RunningStats(relative_accuracy=0.01)
+        running.update(self.values)
+        ordered = sorted(self.values)
+        for q in (0.5, 0.95, 0.99):
+            exact = ordered[int(q * (len(ordered) - 1))]
+            self.assertLessEqual(
+                abs(running.quantile(q) - exact), 0.01 * exact + 1e-9)
+
+    def test_merge_equals_single_pass(self):
+        """Merging partial results matches a single pass over all values"""
+        whole = stats.RunningStats().update(self.values)
+        left = stats.RunningStats().update(self.values[:1234])
+        right = stats.RunningStats().update(self.values[1234:])
+        merged = left.merge(right).summary()
+        for key, value in whole.summary().items():
+            self.assertAlmostEqual(merged[key], value)
+
+    def test_empty(self):
+        """Empty stats report no values"""
+        summary = stats.RunningStats().summary()
+        self.assertEqual(summary["count"], 0)
+        self.assertIsNone(summary["avg"])
+        self.assertIsNone(summary["p50"])
+
+
+class TestSqlSummary(unittest.TestCase):
+    """Tests for sql_summary"""
+
+    def test_single_aggregate_query(self):
+        """All aggregates come back from one query"""
+        cursor = Mock()
+        cursor.fetchone.return_value = (4, 30.5, 18, 45)
+        connection = Mock(cursor=Mock(return_value=cursor))
+        summary = stats.sql_summary(connection, "age")
+        cursor.execute.assert_called_once_with(
+            "SELECT COUNT(age), AVG(age), MIN(age), MAX(age) FROM user_data")
+        self.assertEqual(summary, {"count": 4, "avg": 30.5,
+                                   "min": 18.0, "max": 45.0})
+
+
+if __name__ == "__main__":
+    unittest.main()
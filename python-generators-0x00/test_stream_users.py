@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Unit tests for the 0-stream_users generator"""
+
+import tracemalloc
+import unittest
+from contextlib import contextmanager
+from unittest.mock import patch, Mock
+
+import seed
+
+stream_module = __import__('0-stream_users')
+
+
+class LazyCursor:
+    """Cursor double that builds rows on demand, like an unbuffered cursor"""
+
+    def __init__(self, total_rows, dictionary):
+        self.total_rows = total_rows
+        self.dictionary = dictionary
+        self.position = 0
+        self.closed = False
+
+    def execute(self, query):
+        self.position = 0
+
+    def _row(self, i):
+        row = (f"id-{i}", f"user {i}", f"user{i}@example.com", i % 100)
+        if self.dictionary:
+            return dict(zip(("user_id", "name", "email", "age"), row))
+        return row
+
+    def fetchmany(self, size):
+        end = min(self.position + size, self.total_rows)
+        rows = [self._row(i) for i in range(self.position, end)]
+        self.position = end
+        return rows
+
+    def close(self):
+        self.closed = True
+
+
+def fake_connection(total_rows):
+    """Build a connection mock whose cursor serves total_rows rows"""
+    conn = Mock()
+    conn.cursor.side_effect = lambda buffered, dictionary: LazyCursor(
+        total_rows, dictionary)
+    return conn
+
+
+def pool_serving(conn):
+    """Stand-in for seed.pooled_connection that lends out conn"""
+    @contextmanager
+    def pooled_connection():
+        try:
+            yield conn
+        finally:
+            conn.close()
+    return pooled_connection
+
+
+class TestStreamUsers(unittest.TestCase):
+    """Tests for stream_users"""
+
+    def peak_memory(self, total_rows):
+        """Peak traced memory while draining a stream of total_rows"""
+        with patch.object(seed, "pooled_connection",
+                          pool_serving(fake_connection(total_rows))):
+            tracemalloc.start()
+            for _ in stream_module.stream_users(fetch_size=500):
+                pass
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        return peak
+
+    def test_peak_memory_flat_as_table_grows(self):
+        """Peak memory does not grow with the number of rows streamed"""
+        small = self.peak_memory(10_000)
+        large = self.peak_memory(200_000)
+        self.assertLess(large, small * 1.5)
+
+    def test_tuple_rows(self):
+        """as_tuples=True yields tuples in table order"""
+        with patch.object(seed, "pooled_connection",
+                          pool_serving(fake_connection(3))):
+            rows = list(stream_module.stream_users(as_tuples=True))
+        self.assertEqual([row[0] for row in rows], ["id-0", "id-1", "id-2"])
+        self.assertIsInstance(rows[0], tuple)
+
+    def test_closes_on_early_exit(self):
+        """Abandoning the generator closes the cursor and releases conn"""
+        conn = fake_connection(100)
+        cursors = []
+        conn.cursor.side_effect = lambda buffered, dictionary: (
+            cursors.append(LazyCursor(100, dictionary)) or cursors[-1])
+        with patch.object(seed, "pooled_connection", pool_serving(conn)):
+            stream = stream_module.stream_users(fetch_size=10)
+            next(stream)
+            stream.close()
+        self.assertTrue(cursors[0].closed)
+        conn.close.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()